@@ -16,10 +16,75 @@ class Settings(BaseSettings):
     # AI Service
     lovable_api_key: str = ""
     lovable_api_url: str = "https://ai.gateway.lovable.dev/v1/chat/completions"
+    ai_http2: bool = True
+    ai_max_connections: int = 100
+    ai_max_keepalive_connections: int = 20
+    ai_keepalive_expiry: float = 30.0
+    ai_connect_timeout: float = 10.0
+    ai_chat_timeout: float = 60.0
+    ai_image_timeout: float = 120.0
+    ai_fanout_concurrency: int = 4
+    ai_variation_timeout: float = 45.0
+    ai_multiverse_deadline: float = 50.0
+    ai_cache_backend: str = "memory"  # memory | sqlite | none
+    ai_cache_ttl: float = 3600.0
+    ai_cache_max_entries: int = 1000
+    ai_cache_path: str = "./ai_cache.sqlite3"
+    ai_rate_limit_rps: float = 5.0
+    ai_rate_limit_burst: int = 10
+    ai_rate_limit_concurrency: int = 8
+    ai_rate_limits: dict[str, dict[str, float]] = {}  # per-model {"rps", "burst", "concurrency"}
+    ai_max_retries: int = 3
+    ai_retry_base_delay: float = 0.5
+    ai_retry_max_delay: float = 30.0
+
+    # Background jobs
+    job_workers: int = 4
+    job_stale_after: float = 600.0
+    job_poll_interval: float = 1.0
+    
+    # Template gallery cache (public listing, per process)
+    template_cache_ttl: float = 60.0
+    template_cache_max_entries: int = 256
+    template_search_backend: str = "mongo"  # mongo (text index) | memory
+    template_search_prefix_candidates: int = 500  # Most recent prefix matches scored per query
+    
+    # Canvas storage
+    canvas_compression: str = "zlib"  # zlib | zstd (requires zstandard) | none
+    canvas_compression_threshold: int = 16384  # bytes of canvas JSON
+    canvas_compression_level: int = 6
+    canvas_asset_min_bytes: int = 1024  # Smaller data: URLs stay inline
+    canvas_asset_release_delay: float = 300.0  # seconds unchanged before dropped images are released
     
     # Storage
     storage_root: str = "./storage"
+    upload_max_bytes: int = 10 * 1024 * 1024
+    upload_chunk_size: int = 1024 * 1024
+    upload_concurrency: int = 4  # Files written at once per upload-multiple request
     public_url_base: str = "http://localhost:8000/storage/v1/object/public/assets"
+    storage_driver: str = "local"  # local | s3 (any S3-compatible store)
+    
+    # S3-compatible object storage (storage_driver = "s3")
+    s3_endpoint_url: str = ""  # e.g. http://localhost:9000 for MinIO; empty for AWS
+    s3_region: str = "us-east-1"
+    s3_bucket: str = ""
+    s3_access_key_id: str = ""
+    s3_secret_access_key: str = ""
+    s3_public_url: str = ""  # CDN or public bucket URL; defaults to the bucket URL
+    s3_presign_expires: int = 900  # seconds
+    s3_multipart_threshold: int = 8 * 1024 * 1024  # Below upload_max_bytes
+    s3_multipart_part_size: int = 5 * 1024 * 1024  # S3 minimum
+    
+    # Image derivatives
+    image_workers: int = 2  # Processes for resizing and rendering images
+    image_variant_widths: list[int] = [160, 320, 640, 1280]
+    image_variant_formats: list[str] = ["webp", "avif"]  # avif needs pillow-avif-plugin
+    image_variant_quality: int = 80
+    image_variant_render_rps: float = 2.0  # Renders per second started by resize requests
+    image_variant_render_burst: int = 20
+    canvas_thumbnail_width: int = 480
+    canvas_thumbnail_format: str = "webp"  # webp | png
+    canvas_thumbnail_debounce: float = 2.0  # seconds without saves before rendering
     
     # CORS
     frontend_url: str = "http://localhost:5173"
@@ -7,6 +7,8 @@ from .models.project import Project
 from .models.brand_kit import BrandKit
 from .models.template import Template
 from .models.template_favorite import TemplateFavorite
+from .models.job import Job
+from .models.asset import Asset
 
 settings = get_settings()
 
@@ -29,6 +31,8 @@ async def connect_db():
             BrandKit,
             Template,
             TemplateFavorite,
+            Job,
+            Asset,
         ]
     )
     print(f"Connected to MongoDB: {settings.mongodb_db_name}")
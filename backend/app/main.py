@@ -1,12 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+from urllib.parse import urlparse
 import os
 
 from .config import get_settings
 from .database import connect_db, disconnect_db
-from .routers import auth, profiles, projects, brand_kits, templates, storage
+from .services.ai_service import ai_service
+from .services.job_service import job_service
+from .services.process_pool import image_pool
+from .services.storage_service import storage_service
+from .services.template_search import template_search
+from .services.storage_files import StorageFiles
+from .routers import auth, profiles, projects, brand_kits, templates, storage, jobs
 from .routers.ai import (
     attention_heatmap,
     brand_dna,
@@ -32,11 +38,32 @@ async def lifespan(app: FastAPI):
     # Startup: Connect to MongoDB
     await connect_db()
     
+    # Startup: Open pooled AI gateway client
+    await ai_service.startup()
+    
+    # Startup: Index templates saved before prefix search tokens
+    await template_search.backfill_tokens()
+    
+    # Startup: Resume queued jobs and start job workers
+    await job_service.start()
+    
     # Create storage directory
     os.makedirs(os.path.join(settings.storage_root, "assets"), exist_ok=True)
     
     yield
     
+    # Shutdown: Stop job workers
+    await job_service.stop()
+    
+    # Shutdown: Stop image worker processes
+    image_pool.shutdown()
+    
+    # Shutdown: Close object storage client
+    await storage_service.close()
+    
+    # Shutdown: Close AI gateway client
+    await ai_service.shutdown()
+    
     # Shutdown: Disconnect from MongoDB
     await disconnect_db()
 
@@ -55,10 +82,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Content-Range", "Accept-Ranges"],
 )
 
-# Static files for storage
-app.mount("/storage", StaticFiles(directory=settings.storage_root), name="storage")
+# Stored files, at the path of their public URLs and at /storage for older links
+public_storage_path = urlparse(settings.public_url_base).path.rstrip("/")
+if public_storage_path.startswith("/storage/"):
+    app.mount(public_storage_path, StorageFiles(directory=settings.storage_root), name="storage-public")
+app.mount("/storage", StorageFiles(directory=settings.storage_root), name="storage")
 
 # Auth & CRUD routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -67,6 +98,7 @@ app.include_router(projects.router, prefix="/api/projects", tags=["Projects"])
 app.include_router(brand_kits.router, prefix="/api/brand-kits", tags=["Brand Kits"])
 app.include_router(templates.router, prefix="/api/templates", tags=["Templates"])
 app.include_router(storage.router, prefix="/api/storage", tags=["Storage"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
 
 # AI routers
 app.include_router(attention_heatmap.router, prefix="/api/ai", tags=["AI"])
@@ -96,7 +128,12 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "version": "1.0.0", "database": "MongoDB Atlas"}
+    return {
+        "status": "healthy",
+        "version": "1.0.0",
+        "database": "MongoDB Atlas",
+        "aiCache": ai_service.cache.stats() if ai_service.cache else None,
+    }
 
 
 if __name__ == "__main__":
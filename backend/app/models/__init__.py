@@ -1,8 +1,10 @@
 from .user import User
-from .profile import Profile
-from .project import Project
-from .brand_kit import BrandKit
-from .template import Template
+from .profile import Profile, ProfileVersionView
+from .project import Project, ProjectSummaryView, ProjectRevisionView
+from .brand_kit import BrandKit, BrandKitVersionView
+from .template import Template, TemplateCardView, TemplateSearchView, TemplateRevisionView
 from .template_favorite import TemplateFavorite
+from .job import Job
+from .asset import Asset
 
-__all__ = ["User", "Profile", "Project", "BrandKit", "Template", "TemplateFavorite"]
+__all__ = ["User", "Profile", "ProfileVersionView", "Project", "ProjectSummaryView", "ProjectRevisionView", "BrandKit", "BrandKitVersionView", "Template", "TemplateCardView", "TemplateSearchView", "TemplateRevisionView", "TemplateFavorite", "Job", "Asset"]
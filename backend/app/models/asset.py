@@ -0,0 +1,44 @@
+from beanie import Document
+from pymongo import IndexModel
+from pydantic import Field
+from datetime import datetime
+from typing import Optional
+
+
+class Asset(Document):
+    """Content-addressed stored file, keyed by the SHA-256 of its bytes.
+
+    ``owners`` counts references per holder (a user id, or
+    ``canvas:<collection>:<id>`` for the images a project's or template's
+    canvas uses, held once each); ``ref_count`` is their total and the file is
+    unlinked when it drops to zero. ``deleting`` is set while the file is being
+    unlinked, so new references wait for a fresh record instead.
+    """
+    id: str  # SHA-256 hex digest
+    path: str  # Storage key, e.g. objects/ab/cd/<sha256>.png
+    size: int
+    content_type: Optional[str] = None
+    ref_count: int = 0
+    owners: dict[str, int] = Field(default_factory=dict)
+    folders: list[str] = Field(default_factory=list)  # ``folder`` labels given on upload
+    deleting: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "assets"
+        indexes = [
+            "path",
+            "ref_count",
+            IndexModel([("owners.$**", 1)]),  # References of one holder
+        ]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+                "path": "objects/9f/86/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08.png",
+                "size": 48213,
+                "ref_count": 2,
+            }
+        }
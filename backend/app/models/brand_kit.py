@@ -1,5 +1,5 @@
 from beanie import Document
-from pydantic import Field
+from pydantic import BaseModel, Field
 from datetime import datetime
 from uuid import uuid4
 from typing import Optional
@@ -34,3 +34,9 @@ class BrandKit(Document):
                 "primary_color": "#22C55E",
             }
         }
+
+
+class BrandKitVersionView(BaseModel):
+    """Projection of BrandKit used for conditional requests."""
+    id: str = Field(alias="_id")
+    updated_at: datetime
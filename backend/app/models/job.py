@@ -0,0 +1,44 @@
+from beanie import Document
+from pydantic import Field
+from datetime import datetime
+from uuid import uuid4
+from typing import Optional, Any
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+JOB_TERMINAL_STATUSES = {JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED}
+
+
+class Job(Document):
+    """Background job document for MongoDB."""
+    id: str = Field(default_factory=lambda: str(uuid4()))
+    user_id: str
+    type: str
+    status: str = JOB_QUEUED
+    payload: dict[str, Any] = Field(default_factory=dict)
+    result: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        name = "jobs"
+        indexes = [
+            "status",
+            [("user_id", 1), ("created_at", -1)],
+        ]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "user_id": "user-uuid",
+                "type": "generate-background",
+                "status": "queued",
+            }
+        }
@@ -1,5 +1,5 @@
 from beanie import Document
-from pydantic import Field
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
@@ -27,3 +27,9 @@ class Profile(Document):
                 "full_name": "John Doe",
             }
         }
+
+
+class ProfileVersionView(BaseModel):
+    """Projection of Profile used for conditional requests."""
+    id: str = Field(alias="_id")
+    updated_at: datetime
@@ -1,5 +1,5 @@
 from beanie import Document
-from pydantic import Field
+from pydantic import BaseModel, Field
 from datetime import datetime
 from uuid import uuid4
 from typing import Optional, Any
@@ -14,7 +14,12 @@ class Project(Document):
     format_id: str = "instagram-feed"
     format_width: int = 1080
     format_height: int = 1080
-    canvas_data: dict[str, Any] = Field(default_factory=dict)
+    canvas_data: dict[str, Any] = Field(default_factory=dict)  # Empty when stored compressed
+    canvas_blob: Optional[bytes] = None  # Compressed canvas JSON, for large canvases
+    canvas_encoding: Optional[str] = None  # zlib | zstd
+    canvas_summary: Optional[dict[str, Any]] = None  # Set alongside canvas_blob
+    canvas_version: int = 0  # Incremented on every canvas write
+    revision: int = 0  # Incremented on every write, exposed as the ETag
     thumbnail_url: Optional[str] = None
     compliance_score: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -25,6 +30,7 @@ class Project(Document):
         indexes = [
             "user_id",
             "brand_kit_id",
+            [("user_id", 1), ("updated_at", -1), ("_id", -1)],  # Dashboard pagination
         ]
 
     class Config:
@@ -35,3 +41,24 @@ class Project(Document):
                 "format_id": "instagram-feed",
             }
         }
+
+
+class ProjectSummaryView(BaseModel):
+    """Projection of Project without canvas_data, for list views."""
+    id: str = Field(alias="_id")
+    user_id: str
+    brand_kit_id: Optional[str] = None
+    name: str
+    format_id: str
+    format_width: int
+    format_height: int
+    thumbnail_url: Optional[str] = None
+    compliance_score: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class ProjectRevisionView(BaseModel):
+    """Projection of Project used for conditional requests."""
+    id: str = Field(alias="_id")
+    revision: int = 0
@@ -1,5 +1,6 @@
 from beanie import Document
-from pydantic import Field
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, TEXT
 from datetime import datetime
 from uuid import uuid4
 from typing import Optional, Any
@@ -14,9 +15,14 @@ class Template(Document):
     category: str = "general"
     format_width: int = 1080
     format_height: int = 1080
-    canvas_data: dict[str, Any] = Field(default_factory=dict)
+    canvas_data: dict[str, Any] = Field(default_factory=dict)  # Empty when stored compressed
+    canvas_blob: Optional[bytes] = None  # Compressed canvas JSON, for large canvases
+    canvas_encoding: Optional[str] = None  # zlib | zstd
+    canvas_summary: Optional[dict[str, Any]] = None  # Set alongside canvas_blob
     thumbnail_url: Optional[str] = None
     is_public: bool = False
+    search_tokens: list[str] = Field(default_factory=list)  # Words of name/category/description, for prefix search
+    revision: int = 0  # Incremented on every write, exposed as the ETag
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -26,6 +32,14 @@ class Template(Document):
             "user_id",
             "is_public",
             "category",
+            "search_tokens",
+            [("is_public", 1), ("category", 1), ("updated_at", -1), ("_id", -1)],  # Gallery by category
+            [("is_public", 1), ("updated_at", -1), ("_id", -1)],  # Gallery, all categories
+            IndexModel(
+                [("name", TEXT), ("category", TEXT), ("description", TEXT)],
+                weights={"name": 10, "category": 5, "description": 1},
+                name="template_text_search",
+            ),
         ]
 
     class Config:
@@ -36,3 +50,29 @@ class Template(Document):
                 "is_public": True,
             }
         }
+
+
+class TemplateCardView(BaseModel):
+    """Projection of Template for gallery cards (no canvas_data)."""
+    id: str = Field(alias="_id")
+    user_id: Optional[str] = None
+    name: str
+    category: str
+    format_width: int
+    format_height: int
+    thumbnail_url: Optional[str] = None
+    is_public: bool
+    updated_at: datetime
+
+
+class TemplateSearchView(TemplateCardView):
+    """Projection of Template used by search (cards plus description)."""
+    description: Optional[str] = None
+
+
+class TemplateRevisionView(BaseModel):
+    """Projection of Template used for conditional requests."""
+    id: str = Field(alias="_id")
+    user_id: Optional[str] = None
+    is_public: bool
+    revision: int = 0
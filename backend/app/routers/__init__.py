@@ -1,3 +1,3 @@
-from . import auth, profiles, projects, brand_kits, templates, storage
+from . import auth, profiles, projects, brand_kits, templates, storage, jobs
 
-__all__ = ["auth", "profiles", "projects", "brand_kits", "templates", "storage"]
+__all__ = ["auth", "profiles", "projects", "brand_kits", "templates", "storage", "jobs"]
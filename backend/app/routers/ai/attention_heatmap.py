@@ -1,15 +1,31 @@
 from fastapi import APIRouter, HTTPException
+import json
 
 from ...schemas.ai_schemas import AttentionHeatmapRequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
+from ...services.saliency_service import compute_attention_heatmap
 
 router = APIRouter()
 
 
 @router.post("/attention-heatmap")
 async def generate_attention_heatmap(request: AttentionHeatmapRequest):
-    """Generate attention heatmap predictions for canvas elements."""
+    """Generate attention heatmap predictions for canvas elements.
+
+    ``engine="local"`` (default) answers from the geometric saliency model;
+    ``engine="llm"`` sends that prediction to the LLM for refinement.
+    """
     try:
+        local_heatmap = compute_attention_heatmap(
+            request.elements,
+            request.canvasWidth,
+            request.canvasHeight,
+            request.format,
+        )
+
+        if request.engine == "local":
+            return local_heatmap
+
         system_prompt = """You are an eye-tracking prediction AI that simulates viewer gaze patterns for advertisements.
 
 Based on the canvas elements provided, predict attention hotspots. Consider:
@@ -47,6 +63,9 @@ Coordinates should be in percentage (0-100) relative to canvas size."""
 Elements on canvas:
 {chr(10).join(elements_desc)}
 
+A geometric saliency model predicts these zones; refine them using your judgement:
+{json.dumps(local_heatmap["zones"])}
+
 Generate attention hotspots predicting where viewers will look first, second, etc."""
 
         response = await ai_service.chat_completion(
@@ -60,5 +79,7 @@ Generate attention hotspots predicting where viewers will look first, second, et
 
         return heatmap_data
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
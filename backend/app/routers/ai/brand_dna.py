@@ -1,23 +1,64 @@
 from fastapi import APIRouter, HTTPException
+from typing import Optional
+import asyncio
+import binascii
 
 from ...schemas.ai_schemas import BrandDNARequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
+from ...services.palette_service import decode_base64_image, try_extract_palette
+from ...services.storage_service import storage_service
 
 router = APIRouter()
 
 
+async def load_image_bytes(request: BrandDNARequest) -> Optional[bytes]:
+    """Get the image pixels from the request body or from our own storage.
+
+    Arbitrary remote URLs are not fetched server-side.
+    """
+    if request.imageBase64:
+        try:
+            return decode_base64_image(request.imageBase64)
+        except (binascii.Error, ValueError):
+            return None
+
+    if request.imageUrl:
+        local_path = await storage_service.fetch_file(request.imageUrl)
+        if local_path:
+            return await asyncio.to_thread(local_path.read_bytes)
+
+    return None
+
+
 @router.post("/brand-dna")
 async def extract_brand_dna(request: BrandDNARequest):
-    """Extract brand DNA from an image and generate a brand kit."""
+    """Extract brand DNA from an image and generate a brand kit.
+
+    Colors are measured from the image pixels when they are available; the LLM
+    only supplies the qualitative brand DNA and font suggestions.
+    """
     try:
         if not request.imageUrl and not request.imageBase64:
             raise HTTPException(status_code=400, detail="Either imageUrl or imageBase64 is required")
 
-        system_prompt = """You are an expert brand analyst specializing in visual identity extraction.
+        # Quantize the image off the event loop
+        image_bytes = await load_image_bytes(request)
+        extracted_colors = await asyncio.to_thread(try_extract_palette, image_bytes)
 
-Analyze the provided product or brand image and extract detailed brand DNA. Return a JSON object with:
-{
-  "brandDNA": {
+        colors_schema = "" if extracted_colors else """,
+  "extractedColors": {
+    "primary": "#hexcolor",
+    "secondary": "#hexcolor",
+    "accent": "#hexcolor",
+    "background": "#hexcolor",
+    "text": "#hexcolor"
+  }"""
+
+        system_prompt = f"""You are an expert brand analyst specializing in visual identity extraction.
+
+Analyze the provided product or brand and extract detailed brand DNA. Return a JSON object with:
+{{
+  "brandDNA": {{
     "personality": ["trait1", "trait2", "trait3"],
     "values": ["value1", "value2", "value3"],
     "tone": "description of brand voice/tone",
@@ -26,32 +67,28 @@ Analyze the provided product or brand image and extract detailed brand DNA. Retu
     "industryCategory": "industry or category",
     "colorMood": "emotional association of colors",
     "typography": "suggested typography style"
-  },
-  "extractedColors": {
-    "primary": "#hexcolor",
-    "secondary": "#hexcolor",
-    "accent": "#hexcolor",
-    "background": "#hexcolor",
-    "text": "#hexcolor"
-  },
-  "suggestedFonts": {
+  }},
+  "suggestedFonts": {{
     "heading": "font name",
     "body": "font name"
-  }
-}"""
+  }}{colors_schema}
+}}"""
 
-        image_context = ""
-        if request.imageUrl:
+        if extracted_colors:
+            image_context = "Colors measured from the image: " + ", ".join(
+                f"{role} {hex_color}" for role, hex_color in extracted_colors.items()
+            )
+        elif request.imageUrl:
             image_context = f"Image URL: {request.imageUrl}"
-        elif request.imageBase64:
+        else:
             image_context = "Analyze the provided base64 image"
 
-        user_prompt = f"""Analyze this brand/product image and extract the brand DNA.
+        user_prompt = f"""Extract the brand DNA for this brand/product.
 
 {image_context}
 {f'Brand Name: {request.brandName}' if request.brandName else ''}
 
-Extract colors, personality traits, and suggest appropriate fonts."""
+Describe personality traits and suggest appropriate fonts."""
 
         response = await ai_service.chat_completion(
             system_prompt=system_prompt,
@@ -62,11 +99,13 @@ Extract colors, personality traits, and suggest appropriate fonts."""
         content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
         brand_data = ai_service.extract_json_from_response(content)
 
+        colors = extracted_colors or brand_data.get("extractedColors", {})
+
         # Build brand kit
         brand_kit = {
-            "primaryColor": brand_data.get("extractedColors", {}).get("primary", "#22C55E"),
-            "secondaryColor": brand_data.get("extractedColors", {}).get("secondary", "#38BDF8"),
-            "accentColor": brand_data.get("extractedColors", {}).get("accent", "#F59E0B"),
+            "primaryColor": colors.get("primary", "#22C55E"),
+            "secondaryColor": colors.get("secondary", "#38BDF8"),
+            "accentColor": colors.get("accent", "#F59E0B"),
             "fontHeading": brand_data.get("suggestedFonts", {}).get("heading", "Inter"),
             "fontBody": brand_data.get("suggestedFonts", {}).get("body", "Inter"),
         }
@@ -74,8 +113,11 @@ Extract colors, personality traits, and suggest appropriate fonts."""
         return {
             "brandDNA": brand_data.get("brandDNA", {}),
             "brandKit": brand_kit,
+            "extractedColors": colors,
             "message": "Brand DNA extracted successfully",
         }
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
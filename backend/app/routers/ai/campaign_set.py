@@ -1,10 +1,16 @@
 from fastapi import APIRouter, HTTPException
-from typing import Any
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator
+import asyncio
 
+from ...config import get_settings
 from ...schemas.ai_schemas import CampaignSetRequest
 from ...services.ai_service import ai_service
+from ...services.ai_rate_limiter import Priority
+from ...services.streaming import SSE_HEADERS, sse_event
 
 router = APIRouter()
+settings = get_settings()
 
 CHANNEL_FORMATS = [
     {"id": "instagram-feed", "name": "Instagram Feed", "width": 1080, "height": 1080, "platform": "instagram"},
@@ -45,57 +51,111 @@ def get_fallback_canvas(format_info: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-@router.post("/campaign-set")
-async def generate_campaign_set(request: CampaignSetRequest):
-    """Generate campaign variations for different channels."""
-    try:
-        # Filter channels
-        if request.selectedChannels:
-            channels = [c for c in CHANNEL_FORMATS if c["id"] in request.selectedChannels]
-        else:
-            channels = CHANNEL_FORMATS[:5]  # Default to first 5
-
-        variations = []
-        hero_creative = None
-
-        for i, channel in enumerate(channels):
-            system_prompt = f"""You are an expert creative designer. Generate a fabric.js compatible JSON canvas layout for a {channel['name']} ({channel['width']}x{channel['height']}px) advertisement.
+async def generate_channel_canvas(
+    request: CampaignSetRequest,
+    channel: dict[str, Any],
+    semaphore: asyncio.Semaphore,
+) -> dict[str, Any]:
+    """Generate the canvas for one channel, falling back on error or timeout."""
+    system_prompt = f"""You are an expert creative designer. Generate a fabric.js compatible JSON canvas layout for a {channel['name']} ({channel['width']}x{channel['height']}px) advertisement.
 
 Return only valid JSON that can be loaded into fabric.js with version "5.3.0".
 Include objects like rect, text, and image placeholders with proper positioning."""
 
-            user_prompt = f"""Create a {channel['name']} creative for:
+    user_prompt = f"""Create a {channel['name']} creative for:
 Campaign: {request.campaignName}
 Product: {request.productDescription}
 Canvas size: {channel['width']}x{channel['height']}px
 
 Generate a professional advertising layout."""
 
-            try:
-                response = await ai_service.chat_completion(
+    try:
+        async with semaphore:
+            response = await asyncio.wait_for(
+                ai_service.chat_completion(
                     system_prompt=system_prompt,
                     user_prompt=user_prompt,
                     temperature=0.7,
-                )
-
-                content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
-                canvas_data = ai_service.extract_json_from_response(content)
-            except Exception:
-                canvas_data = get_fallback_canvas(channel)
-
-            variation = {
-                "id": channel["id"],
-                "name": channel["name"],
-                "width": channel["width"],
-                "height": channel["height"],
-                "platform": channel["platform"],
-                "canvasData": canvas_data,
-            }
-
-            if i == 0:
-                hero_creative = variation
-            else:
-                variations.append(variation)
+                    priority=Priority.BULK,
+                ),
+                timeout=settings.ai_variation_timeout,
+            )
+
+        content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+        canvas_data = ai_service.extract_json_from_response(content)
+    except Exception:
+        canvas_data = get_fallback_canvas(channel)
+
+    return {
+        "id": channel["id"],
+        "name": channel["name"],
+        "width": channel["width"],
+        "height": channel["height"],
+        "platform": channel["platform"],
+        "canvasData": canvas_data,
+    }
+
+
+async def stream_campaign_set(
+    request: CampaignSetRequest,
+    channels: list[dict[str, Any]],
+) -> AsyncIterator[str]:
+    """Emit each channel as a server-sent event as soon as it is generated."""
+    semaphore = asyncio.Semaphore(settings.ai_fanout_concurrency)
+
+    async def generate_indexed(index: int, channel: dict[str, Any]):
+        return index, await generate_channel_canvas(request, channel, semaphore)
+
+    tasks = [
+        asyncio.create_task(generate_indexed(i, channel))
+        for i, channel in enumerate(channels)
+    ]
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, variation = await next_done
+            yield sse_event("variation", {"index": index, "isHero": index == 0, **variation})
+
+        yield sse_event("done", {
+            "campaignName": request.campaignName,
+            "order": [c["id"] for c in channels],
+            "allChannels": CHANNEL_FORMATS,
+        })
+    finally:
+        # Stop outstanding generations if the client disconnects
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/campaign-set")
+async def generate_campaign_set(request: CampaignSetRequest, stream: bool = False):
+    """Generate campaign variations for different channels.
+
+    With ``?stream=true`` the response is a ``text/event-stream`` emitting one
+    ``variation`` event per channel followed by a ``done`` summary event.
+    """
+    try:
+        # Filter channels
+        if request.selectedChannels:
+            channels = [c for c in CHANNEL_FORMATS if c["id"] in request.selectedChannels]
+        else:
+            channels = CHANNEL_FORMATS[:5]  # Default to first 5
+
+        if stream:
+            return StreamingResponse(
+                stream_campaign_set(request, channels),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
+            )
+
+        # Generate all channels concurrently; gather keeps channel order
+        semaphore = asyncio.Semaphore(settings.ai_fanout_concurrency)
+        results = await asyncio.gather(
+            *(generate_channel_canvas(request, channel, semaphore) for channel in channels)
+        )
+
+        hero_creative = results[0] if results else None
+        variations = list(results[1:])
 
         return {
             "campaignName": request.campaignName,
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
 
 from ...schemas.ai_schemas import CanvasControlRequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
+from ...services.ai_rate_limiter import Priority
 
 router = APIRouter()
 
@@ -45,6 +46,7 @@ Parse this command and return the appropriate canvas actions."""
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.3,
+            priority=Priority.INTERACTIVE,
         )
 
         content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -52,5 +54,7 @@ Parse this command and return the appropriate canvas actions."""
 
         return result
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 
 from ...schemas.ai_schemas import ColorPsychologyRequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
 
 router = APIRouter()
 
@@ -46,6 +46,7 @@ Generate comprehensive color recommendations."""
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.4,
+            cache=True,
         )
 
         content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -57,5 +58,7 @@ Generate comprehensive color recommendations."""
             "industry": request.industry,
         }
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
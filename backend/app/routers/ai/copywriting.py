@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 
 from ...schemas.ai_schemas import CopywritingRequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
 
 router = APIRouter()
 
@@ -62,5 +62,7 @@ Create compelling, diverse variations that could work across Instagram, Facebook
 
         return copy_variations
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,10 +1,16 @@
 from fastapi import APIRouter, HTTPException
-from typing import Any
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator
+import asyncio
 
+from ...config import get_settings
 from ...schemas.ai_schemas import CreativeMultiverseRequest
 from ...services.ai_service import ai_service
+from ...services.ai_rate_limiter import Priority
+from ...services.streaming import SSE_HEADERS, sse_event
 
 router = APIRouter()
+settings = get_settings()
 
 STYLE_VARIATIONS = [
     {"id": "minimalist", "name": "Minimalist", "description": "Clean, simple, lots of white space"},
@@ -45,53 +51,153 @@ def get_fallback_variation(style: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-@router.post("/creative-multiverse")
-async def generate_creative_multiverse(request: CreativeMultiverseRequest):
-    """Generate multiple creative variations in different styles."""
-    try:
-        # Filter styles
-        if request.selectedStyles:
-            styles = [s for s in STYLE_VARIATIONS if s["id"] in request.selectedStyles]
-        else:
-            styles = STYLE_VARIATIONS[:4]  # Default to first 4
-
-        variations = []
-
-        for style in styles[:8]:  # Limit to 8 variations
-            system_prompt = f"""You are an expert creative designer. Generate a fabric.js compatible JSON canvas layout in the "{style['name']}" style.
+async def generate_style_canvas(
+    request: CreativeMultiverseRequest,
+    style: dict[str, Any],
+    semaphore: asyncio.Semaphore,
+) -> dict[str, Any]:
+    """Generate the canvas for one style. Raises if the style cannot be generated."""
+    system_prompt = f"""You are an expert creative designer. Generate a fabric.js compatible JSON canvas layout in the "{style['name']}" style.
 
 Style description: {style['description']}
 
 Return only valid JSON that can be loaded into fabric.js with version "5.3.0"."""
 
-            user_prompt = f"""Create a creative design for:
+    user_prompt = f"""Create a creative design for:
 Product: {request.productDescription}
 Style: {style['name']} - {style['description']}
 Canvas size: 1080x1080px
 
 Generate a professional advertising layout in this exact style."""
 
-            try:
-                response = await ai_service.chat_completion(
-                    system_prompt=system_prompt,
-                    user_prompt=user_prompt,
-                    temperature=0.8,
-                )
+    async with semaphore:
+        response = await ai_service.chat_completion(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=0.8,
+            priority=Priority.BULK,
+        )
+
+    content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+    return ai_service.extract_json_from_response(content)
+
+
+def build_variation(style: dict[str, Any], canvas_data: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": style["id"],
+        "name": style["name"],
+        "description": style["description"],
+        "canvasData": canvas_data,
+    }
+
+
+def select_styles(request: CreativeMultiverseRequest) -> list[dict[str, Any]]:
+    if request.selectedStyles:
+        styles = [s for s in STYLE_VARIATIONS if s["id"] in request.selectedStyles]
+    else:
+        styles = STYLE_VARIATIONS[:4]  # Default to first 4
+
+    return styles[:8]  # Limit to 8 variations
+
+
+async def stream_creative_multiverse(
+    request: CreativeMultiverseRequest,
+    styles: list[dict[str, Any]],
+) -> AsyncIterator[str]:
+    """Emit each style as a server-sent event as soon as it is generated."""
+    semaphore = asyncio.Semaphore(settings.ai_fanout_concurrency)
+
+    async def generate_indexed(index: int, style: dict[str, Any]):
+        try:
+            return index, await generate_style_canvas(request, style, semaphore), False
+        except Exception:
+            return index, get_fallback_variation(style), True
+
+    tasks = [
+        asyncio.create_task(generate_indexed(i, style))
+        for i, style in enumerate(styles)
+    ]
+    emitted: set[int] = set()
+    fallback_styles = []
+
+    try:
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=settings.ai_multiverse_deadline):
+                index, canvas_data, is_fallback = await next_done
+                emitted.add(index)
+                if is_fallback:
+                    fallback_styles.append(styles[index]["id"])
+                yield sse_event("variation", {
+                    "index": index,
+                    "fallback": is_fallback,
+                    **build_variation(styles[index], canvas_data),
+                })
+        except asyncio.TimeoutError:
+            pass
+
+        # Fill styles that missed the deadline
+        for index, style in enumerate(styles):
+            if index not in emitted:
+                fallback_styles.append(style["id"])
+                yield sse_event("variation", {
+                    "index": index,
+                    "fallback": True,
+                    **build_variation(style, get_fallback_variation(style)),
+                })
+
+        yield sse_event("done", {
+            "order": [s["id"] for s in styles],
+            "fallbackStyles": fallback_styles,
+            "allStyles": STYLE_VARIATIONS,
+        })
+    finally:
+        # Stop outstanding generations after the deadline or on disconnect
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/creative-multiverse")
+async def generate_creative_multiverse(request: CreativeMultiverseRequest, stream: bool = False):
+    """Generate multiple creative variations in different styles.
+
+    With ``?stream=true`` the response is a ``text/event-stream`` emitting one
+    ``variation`` event per style followed by a ``done`` summary event.
+    """
+    try:
+        styles = select_styles(request)
+
+        if stream:
+            return StreamingResponse(
+                stream_creative_multiverse(request, styles),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
+            )
+
+        # Generate all styles concurrently, keeping whatever finished by the deadline
+        semaphore = asyncio.Semaphore(settings.ai_fanout_concurrency)
+        tasks = [
+            asyncio.create_task(generate_style_canvas(request, style, semaphore))
+            for style in styles
+        ]
+        if tasks:
+            await asyncio.wait(tasks, timeout=settings.ai_multiverse_deadline)
+
+        variations = []
+        fallback_styles = []
 
-                content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
-                canvas_data = ai_service.extract_json_from_response(content)
-            except Exception:
+        for style, task in zip(styles, tasks):
+            if task.done() and not task.cancelled() and task.exception() is None:
+                canvas_data = task.result()
+            else:
+                task.cancel()
                 canvas_data = get_fallback_variation(style)
+                fallback_styles.append(style["id"])
 
-            variations.append({
-                "id": style["id"],
-                "name": style["name"],
-                "description": style["description"],
-                "canvasData": canvas_data,
-            })
+            variations.append(build_variation(style, canvas_data))
 
         return {
             "variations": variations,
+            "fallbackStyles": fallback_styles,
             "allStyles": STYLE_VARIATIONS,
             "message": "Creative variations generated successfully",
         }
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 
 from ...schemas.ai_schemas import EmotionDesignRequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
 
 router = APIRouter()
 
@@ -59,6 +59,7 @@ Create visual parameters that evoke this emotion."""
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.5,
+            cache=True,
         )
 
         content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -70,5 +71,7 @@ Create visual parameters that evoke this emotion."""
             "intensity": request.intensity,
         }
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
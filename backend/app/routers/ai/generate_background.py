@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 
 from ...schemas.ai_schemas import GenerateBackgroundRequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
 
 router = APIRouter()
 
@@ -35,5 +35,7 @@ Requirements:
             "message": "Background generated successfully",
         }
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
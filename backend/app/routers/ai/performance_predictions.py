@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 
 from ...schemas.ai_schemas import PerformancePredictionsRequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
 
 router = APIRouter()
 
@@ -51,5 +51,7 @@ Provide performance predictions and recommendations."""
 
         return predictions
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 
 from ...schemas.ai_schemas import TrendForecastRequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
 
 router = APIRouter()
 
@@ -43,6 +43,7 @@ Analyze current and emerging creative trends."""
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.5,
+            cache=True,
         )
 
         content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -50,5 +51,7 @@ Analyze current and emerging creative trends."""
 
         return trends
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 
 from ...schemas.ai_schemas import TypographyHarmonyRequest
-from ...services.ai_service import ai_service
+from ...services.ai_service import ai_service, AIRateLimitError
 
 router = APIRouter()
 
@@ -54,6 +54,7 @@ Provide harmonious font pairing recommendations."""
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.4,
+            cache=True,
         )
 
         content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -66,5 +67,7 @@ Provide harmonious font pairing recommendations."""
             "message": "Typography suggestions generated successfully",
         }
 
+    except AIRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,22 +1,45 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, status, Depends, Response, Header
+from typing import List, Optional
 
 from ..schemas.brand_kit import BrandKitCreate, BrandKitUpdate, BrandKitResponse
 from ..middleware.auth import get_current_user
 from ..models.user import User
-from ..models.brand_kit import BrandKit
+from ..models.brand_kit import BrandKit, BrandKitVersionView
+from ..services.repository import update_owned, owner_filter
+from ..services.http_cache import (
+    ETAG_HEADER, CACHE_CONTROL_HEADER, PRIVATE_REVALIDATE,
+    timestamp_etag, list_etag, etag_matches, not_modified,
+)
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[BrandKitResponse])
-async def list_brand_kits(current_user: User = Depends(get_current_user)):
-    """List all brand kits for the current user."""
+async def list_brand_kits(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    """List all brand kits for the current user.
+    
+    The ETag covers the ids and write times of the listed kits; a matching
+    ``If-None-Match`` returns 304 after a projection-only query.
+    """
+    if if_none_match:
+        versions = await BrandKit.find(
+            BrandKit.user_id == current_user.id
+        ).sort(-BrandKit.updated_at).project(BrandKitVersionView).to_list()
+        etag = list_etag((bk.id, bk.updated_at) for bk in versions)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    
     brand_kits = await BrandKit.find(
         BrandKit.user_id == current_user.id
     ).sort(-BrandKit.updated_at).to_list()
     
+    response.headers[ETAG_HEADER] = list_etag((bk.id, bk.updated_at) for bk in brand_kits)
+    response.headers[CACHE_CONTROL_HEADER] = PRIVATE_REVALIDATE
+    
     return [
         BrandKitResponse(
             id=bk.id,
@@ -39,6 +62,7 @@ async def list_brand_kits(current_user: User = Depends(get_current_user)):
 @router.post("", response_model=BrandKitResponse, status_code=status.HTTP_201_CREATED)
 async def create_brand_kit(
     brand_kit_data: BrandKitCreate,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ):
     """Create a new brand kit."""
@@ -48,6 +72,8 @@ async def create_brand_kit(
     )
     await brand_kit.insert()
     
+    response.headers[ETAG_HEADER] = timestamp_etag(brand_kit.updated_at)
+    
     return BrandKitResponse(
         id=brand_kit.id,
         user_id=brand_kit.user_id,
@@ -67,9 +93,18 @@ async def create_brand_kit(
 @router.get("/{brand_kit_id}", response_model=BrandKitResponse)
 async def get_brand_kit(
     brand_kit_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
 ):
     """Get a specific brand kit."""
+    if if_none_match:
+        current = await BrandKit.find_one(
+            owner_filter(brand_kit_id, current_user.id),
+        ).project(BrandKitVersionView)
+        if current and etag_matches(if_none_match, timestamp_etag(current.updated_at)):
+            return not_modified(timestamp_etag(current.updated_at))
+    
     brand_kit = await BrandKit.find_one(
         BrandKit.id == brand_kit_id,
         BrandKit.user_id == current_user.id,
@@ -81,6 +116,9 @@ async def get_brand_kit(
             detail="Brand kit not found",
         )
     
+    response.headers[ETAG_HEADER] = timestamp_etag(brand_kit.updated_at)
+    response.headers[CACHE_CONTROL_HEADER] = PRIVATE_REVALIDATE
+    
     return BrandKitResponse(
         id=brand_kit.id,
         user_id=brand_kit.user_id,
@@ -101,27 +139,24 @@ async def get_brand_kit(
 async def update_brand_kit(
     brand_kit_id: str,
     brand_kit_data: BrandKitUpdate,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ):
     """Update a brand kit."""
-    brand_kit = await BrandKit.find_one(
-        BrandKit.id == brand_kit_id,
-        BrandKit.user_id == current_user.id,
+    updated_brand_kit = await update_owned(
+        BrandKit,
+        brand_kit_id,
+        current_user.id,
+        brand_kit_data.model_dump(exclude_unset=True),
     )
     
-    if not brand_kit:
+    if not updated_brand_kit:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Brand kit not found",
         )
     
-    update_data = brand_kit_data.model_dump(exclude_unset=True)
-    update_data["updated_at"] = datetime.utcnow()
-    
-    await brand_kit.update({"$set": update_data})
-    
-    # Refresh the data
-    updated_brand_kit = await BrandKit.find_one(BrandKit.id == brand_kit_id)
+    response.headers[ETAG_HEADER] = timestamp_etag(updated_brand_kit.updated_at)
     
     return BrandKitResponse(
         id=updated_brand_kit.id,
@@ -0,0 +1,178 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Any, AsyncIterator
+import asyncio
+
+from ..config import get_settings
+from ..schemas.job import JobCreate, JobResponse, CanvasAssetBackfillRequest
+from ..schemas.storage import DirectUploadVerifyRequest
+from ..schemas.ai_schemas import CampaignSetRequest, CreativeMultiverseRequest, GenerateBackgroundRequest
+from ..middleware.auth import get_current_user
+from ..models.user import User
+from ..models.job import Job, JOB_TERMINAL_STATUSES
+from ..services.job_service import job_service
+from ..services.canvas_assets import backfill_canvas_assets
+from ..services.streaming import SSE_HEADERS, sse_event
+from .storage import VERIFY_JOB_TYPE, verify_direct_upload
+from .ai.campaign_set import generate_campaign_set
+from .ai.creative_multiverse import generate_creative_multiverse
+from .ai.generate_background import generate_background
+
+router = APIRouter()
+settings = get_settings()
+
+# Long-running AI generations that can be submitted as jobs: type -> (request model, endpoint)
+JOB_TYPES: dict[str, tuple[type[BaseModel], Any]] = {
+    "campaign-set": (CampaignSetRequest, generate_campaign_set),
+    "creative-multiverse": (CreativeMultiverseRequest, generate_creative_multiverse),
+    "generate-background": (GenerateBackgroundRequest, generate_background),
+}
+
+# Maintenance jobs over the submitting user's documents: type -> (request model, fn(request, user_id))
+USER_JOB_TYPES: dict[str, tuple[type[BaseModel], Any]] = {
+    "canvas-asset-backfill": (CanvasAssetBackfillRequest, backfill_canvas_assets),
+    VERIFY_JOB_TYPE: (DirectUploadVerifyRequest, verify_direct_upload),
+}
+
+
+def make_handler(request_model: type[BaseModel], endpoint: Any):
+    async def handler(payload: dict[str, Any], user_id: str) -> dict[str, Any]:
+        return await endpoint(request_model(**payload))
+    return handler
+
+
+def make_user_handler(request_model: type[BaseModel], fn: Any):
+    async def handler(payload: dict[str, Any], user_id: str) -> dict[str, Any]:
+        return await fn(request_model(**payload), user_id)
+    return handler
+
+
+for job_type, (request_model, endpoint) in JOB_TYPES.items():
+    job_service.register(job_type, make_handler(request_model, endpoint))
+
+for job_type, (request_model, fn) in USER_JOB_TYPES.items():
+    job_service.register(job_type, make_user_handler(request_model, fn))
+
+
+def to_job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        user_id=job.user_id,
+        type=job.type,
+        status=job.status,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+async def get_user_job(job_id: str, current_user: User) -> Job:
+    job = await Job.find_one(
+        Job.id == job_id,
+        Job.user_id == current_user.id,
+    )
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+
+    return job
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    job_data: JobCreate,
+    current_user: User = Depends(get_current_user),
+):
+    """Submit a long-running AI generation or maintenance job and return immediately with its job id."""
+    job_types = {**JOB_TYPES, **USER_JOB_TYPES}
+    if job_data.type not in job_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job type. Expected one of: {', '.join(job_types)}",
+        )
+
+    # Validate the payload up front so bad requests fail now, not in the worker
+    request_model, _ = job_types[job_data.type]
+    try:
+        payload = request_model(**job_data.payload).model_dump()
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False),
+        )
+
+    job = await job_service.submit(current_user.id, job_data.type, payload)
+    return to_job_response(job)
+
+
+@router.get("", response_model=List[JobResponse])
+async def list_jobs(current_user: User = Depends(get_current_user)):
+    """List the current user's most recent jobs."""
+    jobs = await Job.find(
+        Job.user_id == current_user.id
+    ).sort(-Job.created_at).limit(50).to_list()
+
+    return [to_job_response(j) for j in jobs]
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Poll a job's status and result."""
+    job = await get_user_job(job_id, current_user)
+    return to_job_response(job)
+
+
+@router.get("/{job_id}/events")
+async def subscribe_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Stream job status changes as server-sent events until the job finishes."""
+    job = await get_user_job(job_id, current_user)
+
+    async def events() -> AsyncIterator[str]:
+        current = job
+        last_seen = None
+
+        while True:
+            if current.updated_at != last_seen:
+                last_seen = current.updated_at
+                yield sse_event("status", to_job_response(current).model_dump(mode="json"))
+
+            if current.status in JOB_TERMINAL_STATUSES:
+                return
+
+            await asyncio.sleep(settings.job_poll_interval)
+            current = await Job.find_one(Job.id == job_id)
+            if current is None:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Cancel a queued or running job."""
+    job = await get_user_job(job_id, current_user)
+
+    if not await job_service.cancel(job.id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job already {job.status}",
+        )
+
+    job = await Job.find_one(Job.id == job_id)
+    return to_job_response(job)
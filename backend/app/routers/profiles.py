@@ -1,17 +1,31 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Response, Header
+from typing import Optional
 
 from ..schemas.profile import ProfileUpdate, ProfileResponse
 from ..middleware.auth import get_current_user
 from ..models.user import User
-from ..models.profile import Profile
-from datetime import datetime
+from ..models.profile import Profile, ProfileVersionView
+from ..services.repository import update_owned
+from ..services.http_cache import (
+    ETAG_HEADER, CACHE_CONTROL_HEADER, PRIVATE_REVALIDATE,
+    timestamp_etag, etag_matches, not_modified,
+)
 
 router = APIRouter()
 
 
 @router.get("/me", response_model=ProfileResponse)
-async def get_my_profile(current_user: User = Depends(get_current_user)):
+async def get_my_profile(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+):
     """Get current user's profile."""
+    if if_none_match:
+        current = await Profile.find_one(Profile.id == current_user.id).project(ProfileVersionView)
+        if current and etag_matches(if_none_match, timestamp_etag(current.updated_at)):
+            return not_modified(timestamp_etag(current.updated_at))
+    
     profile = await Profile.find_one(Profile.id == current_user.id)
     
     if not profile:
@@ -20,6 +34,9 @@ async def get_my_profile(current_user: User = Depends(get_current_user)):
             detail="Profile not found",
         )
     
+    response.headers[ETAG_HEADER] = timestamp_etag(profile.updated_at)
+    response.headers[CACHE_CONTROL_HEADER] = PRIVATE_REVALIDATE
+    
     return ProfileResponse(
         id=profile.id,
         email=profile.email,
@@ -33,23 +50,24 @@ async def get_my_profile(current_user: User = Depends(get_current_user)):
 @router.put("/me", response_model=ProfileResponse)
 async def update_my_profile(
     profile_data: ProfileUpdate,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ):
     """Update current user's profile."""
-    profile = await Profile.find_one(Profile.id == current_user.id)
+    updated_profile = await update_owned(
+        Profile,
+        current_user.id,
+        None,
+        profile_data.model_dump(exclude_unset=True),
+    )
     
-    if not profile:
+    if not updated_profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Profile not found",
         )
     
-    update_data = profile_data.model_dump(exclude_unset=True)
-    update_data["updated_at"] = datetime.utcnow()
-    
-    await profile.update({"$set": update_data})
-    
-    updated_profile = await Profile.find_one(Profile.id == current_user.id)
+    response.headers[ETAG_HEADER] = timestamp_etag(updated_profile.updated_at)
     
     return ProfileResponse(
         id=updated_profile.id,
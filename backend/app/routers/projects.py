@@ -1,31 +1,76 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response, Header
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
 from datetime import datetime
+from uuid import uuid4
+from typing import List, Optional
 
-from ..schemas.project import ProjectCreate, ProjectUpdate, ProjectResponse
+from ..schemas.project import (
+    ProjectCreate, ProjectUpdate, ProjectResponse, ProjectSummaryResponse,
+    CanvasPatch, CanvasPatchResponse,
+)
 from ..middleware.auth import get_current_user
 from ..models.user import User
-from ..models.project import Project
+from ..models.project import Project, ProjectSummaryView, ProjectRevisionView
+from ..services.pagination import NEXT_CURSOR_HEADER, encode_cursor, keyset_filter
+from ..services.repository import update_owned, exists_owned, owner_filter, version_filter
+from ..services.http_cache import (
+    ETAG_HEADER, CACHE_CONTROL_HEADER, PRIVATE_REVALIDATE,
+    revision_etag, etag_matches, parse_if_match, not_modified,
+)
+from ..services.canvas_patch import (
+    CanvasPatchError, CanvasPatchTestFailed, compile_patch, apply_patch,
+)
+from ..services.canvas_storage import pack_canvas, unpack_canvas
+from ..services.canvas_thumbnails import canvas_thumbnail_service, thumbnail_url, RENDERED_FIELDS
+from ..services.canvas_assets import (
+    externalize_images, externalize_patch_images, has_inline_images, document_holder, hold_canvas_assets,
+    canvas_asset_service,
+)
 
 router = APIRouter()
 
 
-@router.get("", response_model=List[ProjectResponse])
-async def list_projects(current_user: User = Depends(get_current_user)):
-    """List all projects for the current user."""
+@router.get("", response_model=List[ProjectSummaryResponse])
+async def list_projects(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
+    """List the current user's projects, most recently updated first.
+
+    Returns summaries without canvas_data. When more projects exist, the cursor
+    for the next page is returned in the ``X-Next-Cursor`` header.
+    """
+    try:
+        after_cursor = keyset_filter(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    
     projects = await Project.find(
-        Project.user_id == current_user.id
-    ).sort(-Project.updated_at).to_list()
+        Project.user_id == current_user.id,
+        after_cursor,
+    ).sort(
+        [("updated_at", -1), ("_id", -1)]
+    ).limit(limit + 1).project(ProjectSummaryView).to_list()
+    
+    if len(projects) > limit:
+        projects = projects[:limit]
+        last = projects[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.updated_at, last.id)
     
     return [
-        ProjectResponse(
+        ProjectSummaryResponse(
             id=p.id,
             user_id=p.user_id,
             name=p.name,
             format_id=p.format_id,
             format_width=p.format_width,
             format_height=p.format_height,
-            canvas_data=p.canvas_data,
             thumbnail_url=p.thumbnail_url,
             compliance_score=p.compliance_score,
             brand_kit_id=p.brand_kit_id,
@@ -39,14 +84,31 @@ async def list_projects(current_user: User = Depends(get_current_user)):
 @router.post("", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project_data: ProjectCreate,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ):
-    """Create a new project."""
+    """Create a new project.
+    
+    Inline images in the canvas are moved to storage. Unless a
+    ``thumbnail_url`` is given, the preview is rendered from the canvas.
+    """
+    project_id = str(uuid4())
+    canvas_data, _ = await externalize_images(project_data.canvas_data, document_holder(Project, project_id))
+    fields = project_data.model_dump()
+    fields.update(await pack_canvas(canvas_data))
+    
     project = Project(
+        id=project_id,
         user_id=current_user.id,
-        **project_data.model_dump(),
+        **fields,
     )
+    if not project.thumbnail_url:
+        project.thumbnail_url = thumbnail_url(Project, project.id)
     await project.insert()
+    await hold_canvas_assets(Project, project.id, canvas_data)
+    canvas_thumbnail_service.schedule(Project, project.id)
+    
+    response.headers[ETAG_HEADER] = revision_etag(project.revision)
     
     return ProjectResponse(
         id=project.id,
@@ -55,10 +117,12 @@ async def create_project(
         format_id=project.format_id,
         format_width=project.format_width,
         format_height=project.format_height,
-        canvas_data=project.canvas_data,
+        canvas_data=canvas_data,
         thumbnail_url=project.thumbnail_url,
         compliance_score=project.compliance_score,
         brand_kit_id=project.brand_kit_id,
+        canvas_version=project.canvas_version,
+        revision=project.revision,
         created_at=project.created_at,
         updated_at=project.updated_at,
     )
@@ -67,9 +131,22 @@ async def create_project(
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project(
     project_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
 ):
-    """Get a specific project."""
+    """Get a specific project.
+    
+    Returns 304 when ``If-None-Match`` carries the current ETag, checked with
+    a revision-only query before the canvas is loaded.
+    """
+    if if_none_match:
+        current = await Project.find_one(
+            owner_filter(project_id, current_user.id),
+        ).project(ProjectRevisionView)
+        if current and etag_matches(if_none_match, revision_etag(current.revision)):
+            return not_modified(revision_etag(current.revision))
+    
     project = await Project.find_one(
         Project.id == project_id,
         Project.user_id == current_user.id,
@@ -81,6 +158,9 @@ async def get_project(
             detail="Project not found",
         )
     
+    response.headers[ETAG_HEADER] = revision_etag(project.revision)
+    response.headers[CACHE_CONTROL_HEADER] = PRIVATE_REVALIDATE
+    
     return ProjectResponse(
         id=project.id,
         user_id=project.user_id,
@@ -88,10 +168,12 @@ async def get_project(
         format_id=project.format_id,
         format_width=project.format_width,
         format_height=project.format_height,
-        canvas_data=project.canvas_data,
+        canvas_data=await unpack_canvas(project),
         thumbnail_url=project.thumbnail_url,
         compliance_score=project.compliance_score,
         brand_kit_id=project.brand_kit_id,
+        canvas_version=project.canvas_version,
+        revision=project.revision,
         created_at=project.created_at,
         updated_at=project.updated_at,
     )
@@ -101,27 +183,68 @@ async def get_project(
 async def update_project(
     project_id: str,
     project_data: ProjectUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
 ):
-    """Update a project."""
-    project = await Project.find_one(
-        Project.id == project_id,
-        Project.user_id == current_user.id,
+    """Update a project.
+    
+    With ``If-Match``, the update only applies if the project is still at that
+    ETag; otherwise it fails with 409. Inline images in the canvas are moved
+    to storage.
+    """
+    update_data = project_data.model_dump(exclude_unset=True)
+    expected = parse_if_match(if_match)
+    
+    inc = {"revision": 1}
+    canvas_data, images = None, 0
+    if "canvas_data" in update_data:
+        inc["canvas_version"] = 1
+        if has_inline_images(update_data["canvas_data"]):
+            # Only store images for a project the caller owns
+            if not await exists_owned(Project, project_id, current_user.id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Project not found",
+                )
+        canvas_data, images = await externalize_images(project_data.canvas_data, document_holder(Project, project_id))
+        update_data.update(await pack_canvas(canvas_data))
+    
+    rerender = bool(RENDERED_FIELDS & update_data.keys())
+    if rerender and "thumbnail_url" not in update_data:
+        update_data["thumbnail_url"] = thumbnail_url(Project, project_id)
+    
+    updated_project = await update_owned(
+        Project,
+        project_id,
+        current_user.id,
+        update_data,
+        inc=inc,
+        conditions=version_filter("revision", expected) if expected is not None else None,
     )
     
-    if not project:
+    if not updated_project:
+        if images:
+            # Release the images stored above once the canvas settles
+            canvas_asset_service.schedule(Project, project_id)
+        if expected is not None and await exists_owned(Project, project_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Project has been modified",
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found",
         )
     
-    update_data = project_data.model_dump(exclude_unset=True)
-    update_data["updated_at"] = datetime.utcnow()
+    if canvas_data is not None:
+        await hold_canvas_assets(Project, project_id, canvas_data)
+        canvas_asset_service.schedule(Project, project_id)
     
-    await project.update({"$set": update_data})
+    if rerender:
+        canvas_thumbnail_service.schedule(Project, project_id)
     
-    # Refresh the project data
-    updated_project = await Project.find_one(Project.id == project_id)
+    response.headers[ETAG_HEADER] = revision_etag(updated_project.revision)
     
     return ProjectResponse(
         id=updated_project.id,
@@ -130,15 +253,163 @@ async def update_project(
         format_id=updated_project.format_id,
         format_width=updated_project.format_width,
         format_height=updated_project.format_height,
-        canvas_data=updated_project.canvas_data,
+        canvas_data=canvas_data if "canvas_data" in update_data else await unpack_canvas(updated_project),
         thumbnail_url=updated_project.thumbnail_url,
         compliance_score=updated_project.compliance_score,
         brand_kit_id=updated_project.brand_kit_id,
+        canvas_version=updated_project.canvas_version,
+        revision=updated_project.revision,
         created_at=updated_project.created_at,
         updated_at=updated_project.updated_at,
     )
 
 
+@router.patch("/{project_id}/canvas", response_model=CanvasPatchResponse)
+async def patch_project_canvas(
+    project_id: str,
+    patch: CanvasPatch,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+):
+    """Apply an incremental change to a project's canvas.
+
+    Accepts JSON Patch operations and object-level deltas computed against
+    ``patch.version``; returns 409 if the canvas has changed since. Patches
+    that map to non-overlapping paths are written as one targeted update
+    (for canvases stored inline); others are applied to the stored canvas and
+    written back conditionally. Inline images in patch values are moved to
+    storage first, and the preview is re-rendered once edits settle.
+    """
+    stored_images = has_inline_images(patch.model_dump(by_alias=True))
+    if stored_images:
+        # Only store images for a project the caller owns
+        if not await exists_owned(Project, project_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found",
+            )
+        patch = await externalize_patch_images(patch, document_holder(Project, project_id))
+    
+    try:
+        result = await apply_canvas_patch(project_id, patch, response, current_user.id)
+    except HTTPException:
+        if stored_images:
+            # Release the images stored above once the canvas settles
+            canvas_asset_service.schedule(Project, project_id)
+        raise
+    
+    await hold_canvas_assets(Project, project_id, patch.model_dump(by_alias=True))
+    canvas_asset_service.schedule(Project, project_id)
+    
+    return result
+
+
+async def apply_canvas_patch(
+    project_id: str,
+    patch: CanvasPatch,
+    response: Response,
+    user_id: str,
+) -> CanvasPatchResponse:
+    """Write a patch for ``patch_project_canvas``, whose images are already in storage."""
+    owned = owner_filter(project_id, user_id)
+    at_version = version_filter("canvas_version", patch.version)
+    now = datetime.utcnow()
+    preview_url = thumbnail_url(Project, project_id)
+    collection = Project.get_motor_collection()
+    
+    try:
+        compiled = compile_patch(patch)
+    except CanvasPatchError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+    
+    if compiled is not None:
+        update, conditions, array_filters = compiled
+        update.setdefault("$set", {}).update({"updated_at": now, "thumbnail_url": preview_url})
+        update["$inc"] = {"canvas_version": 1, "revision": 1}
+        options = {"array_filters": array_filters} if array_filters else {}
+        
+        try:
+            updated = await collection.find_one_and_update(
+                {**owned, **at_version, **conditions, "canvas_blob": None},
+                update,
+                projection={"canvas_version": 1, "revision": 1},
+                return_document=ReturnDocument.AFTER,
+                **options,
+            )
+        except OperationFailure:
+            # A path crosses a value of another type than the patch assumed
+            # (e.g. a field name under an array); apply_patch reports it
+            updated = None
+        if updated:
+            canvas_thumbnail_service.schedule(Project, project_id)
+            response.headers[ETAG_HEADER] = revision_etag(updated["revision"])
+            return CanvasPatchResponse(
+                id=project_id,
+                canvas_version=updated["canvas_version"],
+                revision=updated["revision"],
+                updated_at=now,
+            )
+    
+    # Apply against the stored canvas: the patch has no targeted form, or the
+    # targeted update's version or path preconditions did not hold, or Mongo
+    # rejected it
+    project = await Project.find_one(owned)
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found",
+        )
+    
+    if project.canvas_version != patch.version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Canvas has changed (current version {project.canvas_version})",
+        )
+    
+    try:
+        canvas_data = apply_patch(await unpack_canvas(project), patch)
+    except CanvasPatchTestFailed as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
+    except CanvasPatchError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+    
+    updated = await collection.find_one_and_update(
+        {**owned, **at_version},
+        {
+            "$set": {**await pack_canvas(canvas_data), "updated_at": now, "thumbnail_url": preview_url},
+            "$inc": {"canvas_version": 1, "revision": 1},
+        },
+        projection={"canvas_version": 1, "revision": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    
+    if not updated:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Canvas has changed",
+        )
+    
+    canvas_thumbnail_service.schedule(Project, project_id)
+    response.headers[ETAG_HEADER] = revision_etag(updated["revision"])
+    
+    return CanvasPatchResponse(
+        id=project_id,
+        canvas_version=updated["canvas_version"],
+        revision=updated["revision"],
+        updated_at=now,
+    )
+
+
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(
     project_id: str,
@@ -157,3 +428,5 @@ async def delete_project(
         )
     
     await project.delete()
+    await canvas_thumbnail_service.remove(Project, project_id)
+    await canvas_asset_service.remove(Project, project_id)
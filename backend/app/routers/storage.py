@@ -1,66 +1,411 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response
+from fastapi.responses import FileResponse, RedirectResponse
+from typing import List, AsyncIterator, Optional
+from pathlib import Path
+import asyncio
+import mimetypes
+import math
+import re
+import uuid
 
+from ..config import get_settings
 from ..middleware.auth import get_current_user
+from ..models.asset import Asset
 from ..models.user import User
-from ..services.storage_service import storage_service
+from ..schemas.storage import (
+    AssetClaimRequest, DirectUploadRequest, DirectUploadComplete, DirectUploadAbort, DirectUploadVerifyRequest,
+)
+from ..services.asset_service import asset_service, is_object_path, object_path
+from ..services.http_cache import CACHE_CONTROL_HEADER, IMMUTABLE_CACHE_CONTROL
+from ..services.job_service import job_service
+from ..services.image_variants import (
+    image_variant_service, supported_formats, is_resizable, UnsupportedImageError, RenderLimitError,
+)
+from ..services.storage_drivers import StorageDriver, StorageDriverError
+from ..services.storage_service import storage_service, FileTooLargeError, TEMP_FOLDER
 
 router = APIRouter()
+settings = get_settings()
+
+# Job that hashes multipart direct uploads; registered in routers/jobs.py
+VERIFY_JOB_TYPE = "direct-upload-verify"
+
+# Multipart direct uploads are staged under a random key until verified
+STAGED_UPLOAD_KEY = re.compile(rf"^{re.escape(TEMP_FOLDER)}/[0-9a-f-]{{36}}(\.[A-Za-z0-9]+)?$")
+
+
+async def read_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(settings.upload_chunk_size):
+        yield chunk
+
+
+def asset_response(asset: Asset, filename: str) -> dict:
+    return {
+        "url": storage_service.url_for(asset.path),
+        "filename": filename,
+        "sha256": asset.id,
+        "size": asset.size,
+    }
+
+
+async def store_upload(file: UploadFile, user_id: str, folder: str) -> Asset:
+    """Stream an upload to storage, referenced by ``user_id`` and labelled ``folder``.
+
+    Raises FileTooLargeError over the size limit.
+    """
+    # The multipart parser records the size; reject before copying anything
+    if file.size is not None and file.size > settings.upload_max_bytes:
+        raise FileTooLargeError(settings.upload_max_bytes)
+    
+    asset = await asset_service.store(
+        read_chunks(file),
+        file.filename,
+        user_id,
+        max_bytes=settings.upload_max_bytes,
+        folder=folder,
+    )
+    
+    # Thumbnails for galleries and pickers are rendered in the background
+    image_variant_service.schedule(asset.path)
+    await storage_service.precompress(asset.path)
+    return asset
 
 
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
-    folder: str = "assets",
+    folder: str = Query("assets", max_length=100),
     current_user: User = Depends(get_current_user),
 ):
-    """Upload a file to storage."""
+    """Upload a file to storage.
+    
+    Files are stored once per distinct content; uploading the same bytes again
+    returns the same URL. ``folder`` no longer picks the storage path (files
+    live under ``objects/``); it is recorded on the stored file as a label.
+    """
     if not file.filename:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No filename provided",
         )
     
-    # Read file content
-    content = await file.read()
-    
-    # Validate file size (max 10MB)
-    if len(content) > 10 * 1024 * 1024:
+    try:
+        asset = await store_upload(file, current_user.id, folder)
+    except FileTooLargeError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File too large (max 10MB)",
+            detail=str(e),
         )
     
-    # Upload file
-    url = await storage_service.upload_file(content, file.filename, folder)
-    
-    return {"url": url, "filename": file.filename}
+    return asset_response(asset, file.filename)
 
 
 @router.post("/upload-multiple")
 async def upload_multiple_files(
     files: List[UploadFile] = File(...),
-    folder: str = "assets",
+    folder: str = Query("assets", max_length=100),
     current_user: User = Depends(get_current_user),
 ):
-    """Upload multiple files to storage."""
-    results = []
+    """Upload multiple files to storage, several at a time."""
+    semaphore = asyncio.Semaphore(settings.upload_concurrency)
     
-    for file in files:
-        if not file.filename:
-            continue
-        
-        content = await file.read()
-        
-        # Skip files that are too large
-        if len(content) > 10 * 1024 * 1024:
-            results.append({"filename": file.filename, "error": "File too large"})
-            continue
+    async def upload(file: UploadFile) -> dict:
+        async with semaphore:
+            try:
+                asset = await store_upload(file, current_user.id, folder)
+            except FileTooLargeError:
+                # Skip files that are too large
+                return {"filename": file.filename, "error": "File too large"}
+        return asset_response(asset, file.filename)
+    
+    results = await asyncio.gather(*(upload(file) for file in files if file.filename))
+    
+    return {"files": list(results)}
+
+
+@router.post("/claim")
+async def claim_file(
+    claim: AssetClaimRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """Reuse an already-stored file by its SHA-256 instead of uploading it.
+    
+    Returns 404 if the content is not stored; upload it normally then.
+    """
+    asset = await asset_service.claim(claim.sha256, current_user.id)
+    
+    if not asset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found",
+        )
+    
+    return asset_response(asset, Path(asset.path).name)
+
+
+def direct_upload_driver() -> StorageDriver:
+    driver = storage_service.driver
+    if not driver.supports_direct_upload:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Direct uploads need an object storage driver",
+        )
+    return driver
+
+
+def staged_upload_key(key: Optional[str]) -> str:
+    if not key or not STAGED_UPLOAD_KEY.match(key):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid upload key",
+        )
+    return key
+
+
+def storage_unavailable(e: StorageDriverError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail=f"Storage backend error: {e}",
+    )
+
+
+@router.post("/direct-uploads")
+async def create_direct_upload(
+    request: DirectUploadRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """Start an upload that goes from the client straight to object storage.
+    
+    Returns ``status: "exists"`` and the file if its content is already
+    stored. Otherwise returns a presigned ``upload`` request (``status:
+    "upload"``), or for files above the multipart threshold an ``upload_id``
+    with a presigned URL per part (``status: "multipart"``). Send the result
+    to ``/direct-uploads/complete`` once uploaded.
+    """
+    driver = direct_upload_driver()
+    
+    if request.size > settings.upload_max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(FileTooLargeError(settings.upload_max_bytes)),
+        )
+    
+    asset = await asset_service.claim(request.sha256, current_user.id)
+    if asset:
+        return {"status": "exists", **asset_response(asset, request.filename)}
+    
+    content_type = mimetypes.guess_type(request.filename)[0]
+    
+    if request.size <= settings.s3_multipart_threshold:
+        # Written to its final path; the store checks the signed checksum
+        key = object_path(request.sha256, request.filename)
+        return {
+            "status": "upload",
+            "key": key,
+            "upload": driver.presign_put(key, request.size, request.sha256, content_type),
+        }
+    
+    # Parts cannot be checked against the whole file's hash, so multipart
+    # uploads are staged and verified by a job after completion
+    key = f"{TEMP_FOLDER}/{uuid.uuid4()}{Path(request.filename).suffix.lower()}"
+    try:
+        upload_id = await driver.create_multipart_upload(key, content_type)
+    except StorageDriverError as e:
+        raise storage_unavailable(e)
+    
+    part_size = settings.s3_multipart_part_size
+    parts = []
+    for index in range(math.ceil(request.size / part_size)):
+        size = min(part_size, request.size - index * part_size)
+        parts.append({
+            "part_number": index + 1,
+            "size": size,
+            "url": driver.presign_part(key, upload_id, index + 1, size),
+        })
+    
+    return {
+        "status": "multipart",
+        "key": key,
+        "upload_id": upload_id,
+        "part_size": part_size,
+        "parts": parts,
+    }
+
+
+@router.post("/direct-uploads/complete")
+async def complete_direct_upload(
+    upload: DirectUploadComplete,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+):
+    """Register a finished direct upload.
+    
+    Single-request uploads were checked by the store against their signed
+    SHA-256 and are returned like ``/upload``. Multipart uploads are
+    assembled, then verified by a ``direct-upload-verify`` job: the response
+    is ``202`` with ``status: "verifying"`` and the ``job_id`` to poll, whose
+    result is the file once its content has been hashed.
+    """
+    driver = direct_upload_driver()
+    key = object_path(upload.sha256, upload.filename)
+    
+    if upload.upload_id is not None:
+        staged = staged_upload_key(upload.key)
+        try:
+            await driver.complete_multipart_upload(
+                staged,
+                upload.upload_id,
+                [(part.part_number, part.etag) for part in upload.parts],
+            )
+        except StorageDriverError as e:
+            raise storage_unavailable(e)
         
-        url = await storage_service.upload_file(content, file.filename, folder)
-        results.append({"url": url, "filename": file.filename})
+        job = await job_service.submit(
+            current_user.id,
+            VERIFY_JOB_TYPE,
+            DirectUploadVerifyRequest(
+                filename=upload.filename,
+                size=upload.size,
+                sha256=upload.sha256,
+                key=staged,
+            ).model_dump(),
+        )
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"status": "verifying", "job_id": job.id}
+    
+    try:
+        size = await driver.size(key)
+    except StorageDriverError as e:
+        raise storage_unavailable(e)
+    
+    if size is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found",
+        )
+    if size != upload.size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded size does not match",
+        )
+    
+    return await register_direct_upload(upload.sha256, upload.filename, upload.size, current_user.id)
+
+
+async def register_direct_upload(sha256: str, filename: str, size: int, user_id: str) -> dict:
+    """Reference a verified direct upload stored at its object path."""
+    key = object_path(sha256, filename)
+    asset = await asset_service.register(sha256, filename, size, user_id)
+    if asset.path != key:
+        # Stored meanwhile under another extension; keep only that copy
+        await storage_service.delete_file(key)
+    
+    image_variant_service.schedule(asset.path)
+    return asset_response(asset, filename)
+
+
+async def verify_direct_upload(request: DirectUploadVerifyRequest, user_id: str) -> dict:
+    """Hash a staged multipart upload and store it if it matches its SHA-256.
+    
+    Runs as a job, so the object is read back off the request path. The
+    staged copy is removed either way.
+    """
+    driver = storage_service.driver
+    staged = staged_upload_key(request.key)
+    key = object_path(request.sha256, request.filename)
+    
+    try:
+        if await driver.digest(staged) != (request.sha256, request.size):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uploaded content does not match its SHA-256",
+            )
+        if not await driver.exists(key):
+            await driver.copy(staged, key, mimetypes.guess_type(key)[0])
+    finally:
+        await driver.delete(staged)
+    
+    return await register_direct_upload(request.sha256, request.filename, request.size, user_id)
+
+
+@router.post("/direct-uploads/abort")
+async def abort_direct_upload(
+    upload: DirectUploadAbort,
+    current_user: User = Depends(get_current_user),
+):
+    """Discard the parts of an unfinished multipart direct upload."""
+    driver = direct_upload_driver()
+    
+    try:
+        await driver.abort_multipart_upload(staged_upload_key(upload.key), upload.upload_id)
+    except StorageDriverError as e:
+        raise storage_unavailable(e)
+    
+    return {"message": "Upload aborted"}
+
+
+@router.get("/resize")
+async def resize_file(
+    path: str,
+    width: int,
+    format: str = Query("webp"),
+):
+    """Serve a stored image scaled down to one of the configured widths.
+    
+    Variants are rendered once and then served from storage. Renders for
+    variants that are not cached yet are rate limited (429).
+    """
+    relative_path = storage_service.relative_path(path)
+    
+    if ".." in Path(relative_path).parts or not is_resizable(relative_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found",
+        )
+    
+    if width not in settings.image_variant_widths:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"width must be one of {settings.image_variant_widths}",
+        )
+    
+    formats = supported_formats()
+    if format not in formats:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of {formats}",
+        )
+    
+    try:
+        variant = await image_variant_service.get(relative_path, width, format, throttle=True)
+    except RenderLimitError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found",
+        )
+    except UnsupportedImageError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="File is not a supported image",
+        )
     
-    return {"files": results}
+    local_path = storage_service.driver.local_path(variant)
+    if local_path is None:
+        # Served by the object store (or its CDN) with its own caching
+        return RedirectResponse(storage_service.url_for(variant), status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    
+    # Stored files never change in place, so neither do their variants
+    return FileResponse(
+        local_path,
+        media_type=f"image/{format}",
+        headers={CACHE_CONTROL_HEADER: IMMUTABLE_CACHE_CONTROL},
+    )
 
 
 @router.delete("/{path:path}")
@@ -68,8 +413,22 @@ async def delete_file(
     path: str,
     current_user: User = Depends(get_current_user),
 ):
-    """Delete a file from storage."""
-    success = await storage_service.delete_file(path)
+    """Delete a file from storage.
+    
+    For deduplicated files this drops the caller's reference; the file itself
+    is removed once no references remain.
+    """
+    relative_path = storage_service.relative_path(path)
+    
+    if is_object_path(relative_path):
+        released = await asset_service.release(relative_path, current_user.id)
+        success = released is not None
+        if released:
+            await image_variant_service.remove(relative_path)
+    else:
+        success = await storage_service.delete_file(relative_path)
+        if success:
+            await image_variant_service.remove(relative_path)
     
     if not success:
         raise HTTPException(
@@ -1,61 +1,211 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response, Header
+from uuid import uuid4
+from typing import List, Optional, Any
 
-from ..schemas.template import TemplateCreate, TemplateUpdate, TemplateResponse, TemplateFavoriteResponse
+from ..config import get_settings
+from ..schemas.template import (
+    TemplateCreate,
+    TemplateUpdate,
+    TemplateResponse,
+    TemplateCardResponse,
+    TemplateFavoriteResponse,
+    TemplateSearchHit,
+    TemplateSearchResponse,
+)
 from ..middleware.auth import get_current_user, get_current_user_optional
 from ..models.user import User
-from ..models.template import Template
+from ..models.template import Template, TemplateCardView, TemplateRevisionView, TemplateSearchView
 from ..models.template_favorite import TemplateFavorite
+from ..services.ai_cache import MemoryCacheBackend
+from ..services.pagination import NEXT_CURSOR_HEADER, encode_cursor, keyset_filter
+from ..services.template_search import template_search, search_tokens, SEARCHED_FIELDS
+from ..services.repository import update_owned, exists_owned, owner_filter, version_filter
+from ..services.canvas_storage import pack_canvas, unpack_canvas
+from ..services.canvas_thumbnails import canvas_thumbnail_service, thumbnail_url, RENDERED_FIELDS
+from ..services.canvas_assets import (
+    externalize_images, has_inline_images, document_holder, hold_canvas_assets, canvas_asset_service,
+)
+from ..services.http_cache import (
+    ETAG_HEADER, CACHE_CONTROL_HEADER, PRIVATE_REVALIDATE,
+    public_cache_control, revision_etag, etag_matches, parse_if_match, not_modified,
+)
 
 router = APIRouter()
+settings = get_settings()
 
+# Pages of the anonymous (public-only) gallery, cleared on every template write
+public_listing_cache = MemoryCacheBackend(settings.template_cache_max_entries)
 
-@router.get("", response_model=List[TemplateResponse])
-async def list_templates(current_user: Optional[User] = Depends(get_current_user_optional)):
-    """List all accessible templates (public + user's own)."""
-    if current_user:
-        templates = await Template.find(
-            {"$or": [
-                {"is_public": True},
-                {"user_id": current_user.id},
-            ]}
-        ).sort(-Template.updated_at).to_list()
-    else:
-        templates = await Template.find(
-            Template.is_public == True
-        ).sort(-Template.updated_at).to_list()
+# Public templates may be reused for as long as the gallery cache keeps them
+PUBLIC_CACHE_CONTROL = public_cache_control(settings.template_cache_ttl)
+
+
+def template_cache_control(is_public: bool) -> str:
+    return PUBLIC_CACHE_CONTROL if is_public else PRIVATE_REVALIDATE
+
+
+async def fetch_template_cards(
+    visibility: dict[str, Any],
+    category: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+) -> dict[str, Any]:
+    """Read one page of template cards. Returns the cards and the next cursor."""
+    filters = [visibility, keyset_filter(cursor)]
+    if category:
+        filters.append({"category": category})
     
-    return [
-        TemplateResponse(
+    templates = await Template.find(
+        *filters,
+    ).sort(
+        [("updated_at", -1), ("_id", -1)]
+    ).limit(limit + 1).project(TemplateCardView).to_list()
+    
+    next_cursor = None
+    if len(templates) > limit:
+        templates = templates[:limit]
+        next_cursor = encode_cursor(templates[-1].updated_at, templates[-1].id)
+    
+    cards = [
+        TemplateCardResponse(
             id=t.id,
             user_id=t.user_id,
             name=t.name,
-            description=t.description,
             category=t.category,
             format_width=t.format_width,
             format_height=t.format_height,
-            canvas_data=t.canvas_data,
             thumbnail_url=t.thumbnail_url,
             is_public=t.is_public,
-            created_at=t.created_at,
             updated_at=t.updated_at,
         )
         for t in templates
     ]
+    return {"cards": cards, "next_cursor": next_cursor}
+
+
+@router.get("", response_model=List[TemplateCardResponse])
+async def list_templates(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    """List accessible templates (public + user's own) as lightweight cards.
+
+    When more templates exist, the cursor for the next page is returned in the
+    ``X-Next-Cursor`` header. Public-only pages are served from an in-process
+    cache and are cacheable by browsers and CDNs.
+    """
+    try:
+        keyset_filter(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    
+    if current_user:
+        page = await fetch_template_cards(
+            {"$or": [
+                {"is_public": True},
+                {"user_id": current_user.id},
+            ]},
+            category,
+            cursor,
+            limit,
+        )
+    else:
+        cache_key = f"{category or ''}|{cursor or ''}|{limit}"
+        page = await public_listing_cache.get(cache_key)
+        if page is None:
+            page = await fetch_template_cards({"is_public": True}, category, cursor, limit)
+            await public_listing_cache.set(cache_key, page, settings.template_cache_ttl)
+        response.headers[CACHE_CONTROL_HEADER] = PUBLIC_CACHE_CONTROL
+        response.headers["Vary"] = "Authorization"
+    
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    
+    return page["cards"]
+
+
+@router.get("/search", response_model=TemplateSearchResponse)
+async def search_templates(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern=r"^\d+x\d+$"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    """Search accessible templates by name, category and description.
+
+    The last word of ``q`` matches as a prefix. Results are ranked by relevance;
+    category and format facet counts ignore the ``category``/``format`` filters.
+    """
+    found = await template_search.search(
+        q,
+        user_id=current_user.id if current_user else None,
+        category=category,
+        format=format,
+        limit=limit,
+        offset=offset,
+    )
+    
+    return TemplateSearchResponse(
+        results=[
+            TemplateSearchHit(
+                id=t.id,
+                user_id=t.user_id,
+                name=t.name,
+                description=t.description,
+                category=t.category,
+                format_width=t.format_width,
+                format_height=t.format_height,
+                thumbnail_url=t.thumbnail_url,
+                is_public=t.is_public,
+                updated_at=t.updated_at,
+                score=round(score, 4),
+            )
+            for t, score in found["results"]
+        ],
+        total=found["total"],
+        facets=found["facets"],
+    )
 
 
 @router.post("", response_model=TemplateResponse, status_code=status.HTTP_201_CREATED)
 async def create_template(
     template_data: TemplateCreate,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ):
-    """Create a new template."""
+    """Create a new template.
+    
+    Inline images in the canvas are moved to storage. Unless a
+    ``thumbnail_url`` is given, the preview is rendered from the canvas.
+    """
+    template_id = str(uuid4())
+    canvas_data, _ = await externalize_images(template_data.canvas_data, document_holder(Template, template_id))
+    fields = template_data.model_dump()
+    fields.update(await pack_canvas(canvas_data))
+    
     template = Template(
+        id=template_id,
         user_id=current_user.id,
-        **template_data.model_dump(),
+        **fields,
     )
+    if not template.thumbnail_url:
+        template.thumbnail_url = thumbnail_url(Template, template.id)
+    template.search_tokens = search_tokens(template.model_dump(include=SEARCHED_FIELDS))
     await template.insert()
+    await hold_canvas_assets(Template, template.id, canvas_data)
+    canvas_thumbnail_service.schedule(Template, template.id)
+    await public_listing_cache.clear()
+    template_search.invalidate()
+    
+    response.headers[ETAG_HEADER] = revision_etag(template.revision)
     
     return TemplateResponse(
         id=template.id,
@@ -65,9 +215,10 @@ async def create_template(
         category=template.category,
         format_width=template.format_width,
         format_height=template.format_height,
-        canvas_data=template.canvas_data,
+        canvas_data=canvas_data,
         thumbnail_url=template.thumbnail_url,
         is_public=template.is_public,
+        revision=template.revision,
         created_at=template.created_at,
         updated_at=template.updated_at,
     )
@@ -76,9 +227,21 @@ async def create_template(
 @router.get("/{template_id}", response_model=TemplateResponse)
 async def get_template(
     template_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: Optional[User] = Depends(get_current_user_optional),
 ):
-    """Get a specific template."""
+    """Get a specific template.
+    
+    Returns 304 when ``If-None-Match`` carries the current ETag, checked with
+    a revision-only query before the canvas is loaded.
+    """
+    if if_none_match:
+        current = await Template.find_one(Template.id == template_id).project(TemplateRevisionView)
+        visible = current and (current.is_public or (current_user and current.user_id == current_user.id))
+        if visible and etag_matches(if_none_match, revision_etag(current.revision)):
+            return not_modified(revision_etag(current.revision), template_cache_control(current.is_public))
+    
     template = await Template.find_one(Template.id == template_id)
     
     if not template:
@@ -95,6 +258,9 @@ async def get_template(
                 detail="Not authorized to access this template",
             )
     
+    response.headers[ETAG_HEADER] = revision_etag(template.revision)
+    response.headers[CACHE_CONTROL_HEADER] = template_cache_control(template.is_public)
+    
     return TemplateResponse(
         id=template.id,
         user_id=template.user_id,
@@ -103,9 +269,10 @@ async def get_template(
         category=template.category,
         format_width=template.format_width,
         format_height=template.format_height,
-        canvas_data=template.canvas_data,
+        canvas_data=await unpack_canvas(template),
         thumbnail_url=template.thumbnail_url,
         is_public=template.is_public,
+        revision=template.revision,
         created_at=template.created_at,
         updated_at=template.updated_at,
     )
@@ -115,26 +282,85 @@ async def get_template(
 async def update_template(
     template_id: str,
     template_data: TemplateUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
 ):
-    """Update a template."""
-    template = await Template.find_one(
-        Template.id == template_id,
-        Template.user_id == current_user.id,
+    """Update a template.
+    
+    With ``If-Match``, the update only applies if the template is still at
+    that ETag; otherwise it fails with 409, as it does when a searched field
+    this update leaves alone changes while it is applied. Inline images in
+    the canvas are moved to storage.
+    """
+    update_data = template_data.model_dump(exclude_unset=True)
+    expected = parse_if_match(if_match)
+    
+    canvas_data, images = None, 0
+    if "canvas_data" in update_data:
+        if has_inline_images(update_data["canvas_data"]):
+            # Only store images for a template the caller owns
+            if not await exists_owned(Template, template_id, current_user.id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Template not found",
+                )
+        canvas_data, images = await externalize_images(template_data.canvas_data, document_holder(Template, template_id))
+        update_data.update(await pack_canvas(canvas_data))
+    
+    rerender = bool(RENDERED_FIELDS & update_data.keys())
+    if rerender and "thumbnail_url" not in update_data:
+        update_data["thumbnail_url"] = thumbnail_url(Template, template_id)
+    
+    conditions = version_filter("revision", expected) if expected is not None else {}
+    searched = SEARCHED_FIELDS & update_data.keys()
+    if searched:
+        values = {field: update_data[field] for field in searched}
+        unchanged = SEARCHED_FIELDS - searched
+        if unchanged:
+            current = await Template.find_one(
+                owner_filter(template_id, current_user.id),
+            ).project(TemplateSearchView)
+            if current:
+                values.update(current.model_dump(include=unchanged))
+                # The tokens also cover these, so they must not change meanwhile
+                conditions.update({field: values[field] for field in unchanged})
+        update_data["search_tokens"] = search_tokens(values)
+    
+    updated_template = await update_owned(
+        Template,
+        template_id,
+        current_user.id,
+        update_data,
+        inc={"revision": 1},
+        conditions=conditions or None,
     )
     
-    if not template:
+    if not updated_template:
+        if images:
+            # Release the images stored above once the canvas settles
+            canvas_asset_service.schedule(Template, template_id)
+        if conditions and await exists_owned(Template, template_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Template has been modified",
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Template not found",
         )
     
-    update_data = template_data.model_dump(exclude_unset=True)
-    update_data["updated_at"] = datetime.utcnow()
+    if canvas_data is not None:
+        await hold_canvas_assets(Template, template_id, canvas_data)
+        canvas_asset_service.schedule(Template, template_id)
+    
+    await public_listing_cache.clear()
+    template_search.invalidate()
     
-    await template.update({"$set": update_data})
+    if rerender:
+        canvas_thumbnail_service.schedule(Template, template_id)
     
-    updated_template = await Template.find_one(Template.id == template_id)
+    response.headers[ETAG_HEADER] = revision_etag(updated_template.revision)
     
     return TemplateResponse(
         id=updated_template.id,
@@ -144,9 +370,10 @@ async def update_template(
         category=updated_template.category,
         format_width=updated_template.format_width,
         format_height=updated_template.format_height,
-        canvas_data=updated_template.canvas_data,
+        canvas_data=canvas_data if "canvas_data" in update_data else await unpack_canvas(updated_template),
         thumbnail_url=updated_template.thumbnail_url,
         is_public=updated_template.is_public,
+        revision=updated_template.revision,
         created_at=updated_template.created_at,
         updated_at=updated_template.updated_at,
     )
@@ -170,6 +397,10 @@ async def delete_template(
         )
     
     await template.delete()
+    await canvas_thumbnail_service.remove(Template, template_id)
+    await canvas_asset_service.remove(Template, template_id)
+    await public_listing_cache.clear()
+    template_search.invalidate()
 
 
 # Favorites
@@ -1,14 +1,26 @@
 from .user import UserCreate, UserLogin, UserResponse, TokenResponse
 from .profile import ProfileUpdate, ProfileResponse
-from .project import ProjectCreate, ProjectUpdate, ProjectResponse
+from .project import (
+    ProjectCreate, ProjectUpdate, ProjectResponse, ProjectSummaryResponse,
+    CanvasPatch, CanvasPatchResponse,
+)
 from .brand_kit import BrandKitCreate, BrandKitUpdate, BrandKitResponse
 from .template import TemplateCreate, TemplateUpdate, TemplateResponse
+from .job import JobCreate, JobResponse
+from .storage import (
+    AssetClaimRequest, DirectUploadRequest, DirectUploadPart, DirectUploadComplete, DirectUploadAbort,
+    DirectUploadVerifyRequest,
+)
 from .ai_schemas import *
 
 __all__ = [
     "UserCreate", "UserLogin", "UserResponse", "TokenResponse",
     "ProfileUpdate", "ProfileResponse",
-    "ProjectCreate", "ProjectUpdate", "ProjectResponse",
+    "ProjectCreate", "ProjectUpdate", "ProjectResponse", "ProjectSummaryResponse",
+    "CanvasPatch", "CanvasPatchResponse",
     "BrandKitCreate", "BrandKitUpdate", "BrandKitResponse",
     "TemplateCreate", "TemplateUpdate", "TemplateResponse",
+    "JobCreate", "JobResponse",
+    "AssetClaimRequest", "DirectUploadRequest", "DirectUploadPart", "DirectUploadComplete", "DirectUploadAbort",
+    "DirectUploadVerifyRequest",
 ]
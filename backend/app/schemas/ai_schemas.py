@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Any
+from typing import Optional, Any, Literal
 
 
 # Attention Heatmap
@@ -19,6 +19,7 @@ class AttentionHeatmapRequest(BaseModel):
     canvasWidth: int
     canvasHeight: int
     format: str
+    engine: Literal["local", "llm"] = "local"
 
 
 # Brand DNA
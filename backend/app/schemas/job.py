@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from uuid import UUID
+from datetime import datetime
+from typing import Optional, Any, Literal
+
+
+class JobCreate(BaseModel):
+    type: str
+    payload: dict[str, Any] = {}
+
+
+class JobResponse(BaseModel):
+    id: UUID
+    user_id: UUID
+    type: str
+    status: str
+    result: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CanvasAssetBackfillRequest(BaseModel):
+    collections: list[Literal["projects", "templates"]] = ["projects", "templates"]
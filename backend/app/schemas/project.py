@@ -1,7 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from uuid import UUID
 from datetime import datetime
-from typing import Optional, Any
+from typing import Optional, Any, Literal
 
 
 class ProjectCreate(BaseModel):
@@ -35,8 +35,71 @@ class ProjectResponse(BaseModel):
     thumbnail_url: Optional[str] = None
     compliance_score: int
     brand_kit_id: Optional[UUID] = None
+    canvas_version: int = 0
+    revision: int = 0
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
+
+
+class ProjectSummaryResponse(BaseModel):
+    id: UUID
+    user_id: UUID
+    name: str
+    format_id: str
+    format_width: int
+    format_height: int
+    thumbnail_url: Optional[str] = None
+    compliance_score: int
+    brand_kit_id: Optional[UUID] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class CanvasPatchOperation(BaseModel):
+    """A JSON Patch (RFC 6902) operation against canvas_data."""
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str
+    value: Any = None
+    from_: Optional[str] = Field(None, alias="from")
+    
+    class Config:
+        populate_by_name = True
+
+
+class CanvasObjectDelta(BaseModel):
+    """Changed properties of one fabric object, addressed by id or index."""
+    id: Optional[str] = None
+    index: Optional[int] = Field(None, ge=0)
+    changes: dict[str, Any]
+    
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.id is None) == (self.index is None):
+            raise ValueError("Exactly one of 'id' or 'index' is required")
+        return self
+
+
+class CanvasPatch(BaseModel):
+    """Incremental canvas change computed against ``version``.
+
+    JSON Patch ``operations`` are applied first, then the object-level deltas.
+    """
+    version: int = Field(ge=0)
+    operations: list[CanvasPatchOperation] = []
+    properties: dict[str, Any] = {}
+    objects: list[CanvasObjectDelta] = []
+    added_objects: list[dict[str, Any]] = []
+    removed_object_ids: list[str] = []
+
+
+class CanvasPatchResponse(BaseModel):
+    id: UUID
+    canvas_version: int
+    revision: int
+    updated_at: datetime
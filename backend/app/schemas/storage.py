@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class AssetClaimRequest(BaseModel):
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")
+
+
+class DirectUploadRequest(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    size: int = Field(gt=0)
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")
+
+
+class DirectUploadPart(BaseModel):
+    part_number: int = Field(ge=1, le=10000)
+    etag: str
+
+
+class DirectUploadComplete(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    size: int = Field(gt=0)
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")
+    upload_id: Optional[str] = None  # Multipart uploads only
+    key: Optional[str] = None
+    parts: List[DirectUploadPart] = []
+
+
+class DirectUploadAbort(BaseModel):
+    upload_id: str
+    key: str
+
+
+class DirectUploadVerifyRequest(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    size: int = Field(gt=0)
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")
+    key: str  # Staged multipart upload
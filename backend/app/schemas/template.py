@@ -37,6 +37,7 @@ class TemplateResponse(BaseModel):
     canvas_data: dict[str, Any]
     thumbnail_url: Optional[str] = None
     is_public: bool
+    revision: int = 0
     created_at: datetime
     updated_at: datetime
     
@@ -44,6 +45,44 @@ class TemplateResponse(BaseModel):
         from_attributes = True
 
 
+class TemplateCardResponse(BaseModel):
+    id: UUID
+    user_id: Optional[UUID] = None
+    name: str
+    category: str
+    format_width: int
+    format_height: int
+    thumbnail_url: Optional[str] = None
+    is_public: bool
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class TemplateSearchHit(TemplateCardResponse):
+    description: Optional[str] = None
+    score: float
+
+
+class TemplateFacetCount(BaseModel):
+    value: str
+    count: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+class TemplateSearchFacets(BaseModel):
+    categories: list[TemplateFacetCount]
+    formats: list[TemplateFacetCount]
+
+
+class TemplateSearchResponse(BaseModel):
+    results: list[TemplateSearchHit]
+    total: int
+    facets: TemplateSearchFacets
+
+
 class TemplateFavoriteResponse(BaseModel):
     id: UUID
     user_id: UUID
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Any
+
+from ..config import get_settings
+
+settings = get_settings()
+
+
+class CacheBackend:
+    """Interface for AI response cache storage."""
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: dict[str, Any], ttl: float) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict[str, Any], ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Local-disk LRU cache that survives restarts."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = asyncio.Lock()
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS ai_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ai_cache_accessed ON ai_cache (accessed_at)")
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[dict[str, Any]]:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM ai_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at = row
+        if expires_at < now:
+            self._conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+
+        self._conn.execute("UPDATE ai_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        return json.loads(value)
+
+    def _set(self, key: str, value: dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO ai_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now),
+        )
+        # Evict least recently used entries beyond the limit
+        self._conn.execute(
+            """DELETE FROM ai_cache WHERE key IN (
+                SELECT key FROM ai_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+
+    def _clear(self) -> None:
+        self._conn.execute("DELETE FROM ai_cache")
+        self._conn.commit()
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: dict[str, Any], ttl: float) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def clear(self) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._clear)
+
+
+class AICache:
+    """Content-addressed cache for AI gateway responses."""
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(body: dict[str, Any]) -> str:
+        """Hash a gateway request body (model, temperature, prompts, tools)."""
+        canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: dict[str, Any], ttl: Optional[float] = None) -> None:
+        await self.backend.set(key, value, ttl if ttl is not None else self.ttl)
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def create_ai_cache() -> Optional[AICache]:
+    """Build the AI cache configured in Settings, or None if disabled."""
+    if settings.ai_cache_backend == "memory":
+        backend = MemoryCacheBackend(settings.ai_cache_max_entries)
+    elif settings.ai_cache_backend == "sqlite":
+        backend = SQLiteCacheBackend(settings.ai_cache_path, settings.ai_cache_max_entries)
+    elif settings.ai_cache_backend == "none":
+        return None
+    else:
+        raise ValueError(f"Unknown AI cache backend: {settings.ai_cache_backend}")
+
+    return AICache(backend, ttl=settings.ai_cache_ttl)
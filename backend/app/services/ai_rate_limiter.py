@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import AsyncIterator, Optional
+
+from ..config import get_settings
+
+settings = get_settings()
+
+
+class Priority(IntEnum):
+    """Scheduling priority for gateway calls. Lower values run first."""
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BULK = 2
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self) -> float:
+        """Take a token. Returns 0 on success, otherwise seconds until one is available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ModelLimiter:
+    """Rate and concurrency limiter for one model with a priority wait queue."""
+
+    def __init__(self, rate: float, burst: int, concurrency: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = max(1, concurrency)
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _dispatch(self) -> None:
+        self._timer = None
+
+        while self._waiters and self.active < self.concurrency:
+            # Drop waiters that gave up before reaching the front
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+                continue
+
+            wait = self.bucket.try_acquire()
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+
+            _, _, future = heapq.heappop(self._waiters)
+            self.active += 1
+            future.set_result(None)
+
+    def _release(self) -> None:
+        self.active -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[None]:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._counter), future))
+        if self._timer is None:
+            self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been granted just before cancellation
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+        try:
+            yield
+        finally:
+            self._release()
+
+
+class RateLimiter:
+    """Process-wide limiter for AI gateway calls, configured per model."""
+
+    def __init__(self):
+        self._limiters: dict[str, ModelLimiter] = {}
+
+    def _get_limiter(self, model: str) -> ModelLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            overrides = settings.ai_rate_limits.get(model, {})
+            limiter = ModelLimiter(
+                rate=overrides.get("rps", settings.ai_rate_limit_rps),
+                burst=overrides.get("burst", settings.ai_rate_limit_burst),
+                concurrency=overrides.get("concurrency", settings.ai_rate_limit_concurrency),
+            )
+            self._limiters[model] = limiter
+        return limiter
+
+    def slot(self, model: str, priority: Priority = Priority.DEFAULT):
+        """Wait for permission to send one request to ``model``."""
+        return self._get_limiter(model).slot(priority)
+
+
+def retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before retry ``attempt`` (0-based).
+
+    Honors a ``Retry-After`` header when present, otherwise uses exponential
+    backoff with full jitter.
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), settings.ai_retry_max_delay)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+                return min(max(delay, 0.0), settings.ai_retry_max_delay)
+            except (TypeError, ValueError):
+                pass
+
+    ceiling = min(settings.ai_retry_max_delay, settings.ai_retry_base_delay * (2 ** attempt))
+    return random.uniform(0, ceiling)
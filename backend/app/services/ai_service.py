@@ -1,26 +1,102 @@
 import httpx
 from typing import Optional, Any
+import asyncio
 import json
 import re
 
 from ..config import get_settings
+from .ai_cache import AICache, create_ai_cache
+from .ai_rate_limiter import Priority, RateLimiter, retry_delay
 
 settings = get_settings()
 
+# Gateway responses that are retried after a backoff
+RETRYABLE_STATUS_CODES = {429, 503}
+
+
+class AIRateLimitError(Exception):
+    """Raised when the AI gateway keeps rate limiting after all retries."""
+
 
 class AIService:
     def __init__(self):
         self.api_url = settings.lovable_api_url
         self.api_key = settings.lovable_api_key
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache: Optional[AICache] = create_ai_cache()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.rate_limiter = RateLimiter()
+
+    async def startup(self) -> None:
+        """Create the shared, pooled HTTP client used for all gateway calls."""
+        if self._client is not None:
+            return
+
+        self._client = httpx.AsyncClient(
+            http2=settings.ai_http2,
+            limits=httpx.Limits(
+                max_connections=settings.ai_max_connections,
+                max_keepalive_connections=settings.ai_max_keepalive_connections,
+                keepalive_expiry=settings.ai_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.ai_chat_timeout,
+                connect=settings.ai_connect_timeout,
+            ),
+        )
+
+    async def shutdown(self) -> None:
+        """Close the shared HTTP client and release pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("AIService has not been started")
+        return self._client
+
+    async def _post(
+        self,
+        body: dict[str, Any],
+        timeout: float,
+        priority: Priority = Priority.DEFAULT,
+    ) -> dict[str, Any]:
+        """Send a request to the AI gateway, coalescing identical in-flight requests.
 
-    async def chat_completion(
+        Concurrent callers with the same body share one upstream call and all
+        receive its result (or its error).
+        """
+        key = AICache.make_key(body)
+        inflight = self._inflight.get(key)
+
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._send(body, timeout, priority))
+            self._inflight[key] = inflight
+
+            def on_done(future: asyncio.Future) -> None:
+                self._inflight.pop(key, None)
+                # Mark the error as retrieved even if every waiter was cancelled
+                if not future.cancelled():
+                    future.exception()
+
+            inflight.add_done_callback(on_done)
+
+        # Shield so one waiter timing out does not cancel the shared call
+        return await asyncio.shield(inflight)
+
+    async def _send(
         self,
-        system_prompt: str,
-        user_prompt: str,
-        model: str = "google/gemini-2.5-flash",
-        temperature: float = 0.7,
-        tools: Optional[list[dict]] = None,
+        body: dict[str, Any],
+        timeout: float,
+        priority: Priority,
     ) -> dict[str, Any]:
+        """Send a request to the AI gateway over the shared client.
+
+        Each attempt waits for a rate limiter slot for the model; 429/503
+        responses are retried with backoff until ``ai_max_retries`` is reached.
+        """
         if not self.api_key:
             raise ValueError("LOVABLE_API_KEY is not configured")
 
@@ -29,6 +105,44 @@ class AIService:
             "Content-Type": "application/json",
         }
 
+        for attempt in range(settings.ai_max_retries + 1):
+            async with self.rate_limiter.slot(body["model"], priority):
+                response = await self.client.post(
+                    self.api_url,
+                    headers=headers,
+                    json=body,
+                    timeout=httpx.Timeout(timeout, connect=settings.ai_connect_timeout),
+                )
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < settings.ai_max_retries:
+                await asyncio.sleep(retry_delay(attempt, response.headers.get("Retry-After")))
+                continue
+
+            if response.status_code == 429:
+                raise AIRateLimitError("Rate limit exceeded")
+
+            if response.status_code != 200:
+                raise Exception(f"AI gateway error: {response.status_code}")
+
+            return response.json()
+
+    async def chat_completion(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str = "google/gemini-2.5-flash",
+        temperature: float = 0.7,
+        tools: Optional[list[dict]] = None,
+        cache: bool = False,
+        cache_ttl: Optional[float] = None,
+        priority: Priority = Priority.DEFAULT,
+    ) -> dict[str, Any]:
+        """Run a chat completion.
+
+        Routes whose output depends only on the prompt can pass ``cache=True``
+        to serve repeat requests from the response cache. ``priority`` orders
+        the call in the rate limiter queue.
+        """
         body = {
             "model": model,
             "messages": [
@@ -41,16 +155,17 @@ class AIService:
         if tools:
             body["tools"] = tools
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(self.api_url, headers=headers, json=body)
+        if not cache or self.cache is None:
+            return await self._post(body, timeout=settings.ai_chat_timeout, priority=priority)
 
-            if response.status_code == 429:
-                raise Exception("Rate limit exceeded")
-            
-            if response.status_code != 200:
-                raise Exception(f"AI gateway error: {response.status_code}")
+        key = AICache.make_key(body)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
 
-            return response.json()
+        response = await self._post(body, timeout=settings.ai_chat_timeout, priority=priority)
+        await self.cache.set(key, response, ttl=cache_ttl)
+        return response
 
     @staticmethod
     def extract_json_from_response(content: str) -> dict[str, Any]:
@@ -59,12 +174,12 @@ class AIService:
         json_match = re.search(r"```(?:json)?\s*([\s\S]*?)```", content)
         if json_match:
             return json.loads(json_match.group(1).strip())
-        
+
         # Try to find raw JSON
         json_match = re.search(r"\{[\s\S]*\}", content)
         if json_match:
             return json.loads(json_match.group(0))
-        
+
         raise ValueError("Failed to parse JSON from AI response")
 
     async def generate_image(
@@ -73,14 +188,6 @@ class AIService:
         model: str = "google/gemini-3-pro-image-preview",
     ) -> str:
         """Generate an image using the AI gateway."""
-        if not self.api_key:
-            raise ValueError("LOVABLE_API_KEY is not configured")
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-
         body = {
             "model": model,
             "messages": [
@@ -88,25 +195,17 @@ class AIService:
             ],
         }
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(self.api_url, headers=headers, json=body)
+        data = await self._post(body, timeout=settings.ai_image_timeout)
 
-            if response.status_code == 429:
-                raise Exception("Rate limit exceeded")
-            
-            if response.status_code != 200:
-                raise Exception(f"AI gateway error: {response.status_code}")
+        # Extract image URL from response
+        content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+        # Look for image URL in response
+        url_match = re.search(r'https?://[^\s"\']+\.(?:png|jpg|jpeg|webp)', content)
+        if url_match:
+            return url_match.group(0)
 
-            data = response.json()
-            # Extract image URL from response
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            # Look for image URL in response
-            url_match = re.search(r'https?://[^\s"\']+\.(?:png|jpg|jpeg|webp)', content)
-            if url_match:
-                return url_match.group(0)
-            
-            return content
+        return content
 
 
 # Singleton instance
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import mimetypes
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from beanie import UpdateResponse
+from pymongo.errors import DuplicateKeyError
+
+from ..models.asset import Asset
+from .storage_service import storage_service
+
+# Content-addressed files live under objects/<aa>/<bb>/<sha256><ext>
+OBJECTS_FOLDER = "objects"
+
+# How often a new reference re-checks a file that is being deleted, and when
+# a deletion counts as abandoned (its process died) and is finished by others
+DELETE_POLL_INTERVAL = 0.05  # seconds
+DELETE_STALE_AFTER = timedelta(seconds=60)
+
+
+def object_path(sha256: str, filename: str) -> str:
+    """Sharded storage path for content with the given digest."""
+    return f"{OBJECTS_FOLDER}/{sha256[:2]}/{sha256[2:4]}/{sha256}{Path(filename).suffix.lower()}"
+
+
+def is_object_path(relative_path: str) -> bool:
+    return relative_path.startswith(f"{OBJECTS_FOLDER}/")
+
+
+def canvas_holder(collection: str, doc_id: str) -> str:
+    """Reference holder for the images used by a project's or template's canvas."""
+    return f"canvas:{collection}:{doc_id}"
+
+
+class AssetService:
+    """Deduplicated file storage with per-holder reference counts.
+
+    Identical content is written once; every upload adds a reference for its
+    holder, and the file is unlinked only when the last reference is released.
+    With ``once``, a holder references a file at most once however often it
+    stores it (used for canvases, which re-send their images on every save).
+    """
+
+    def _reference_update(self, holder: str, once: bool = False) -> dict:
+        if once:
+            return {
+                "$inc": {"ref_count": 1},
+                "$set": {f"owners.{holder}": 1, "updated_at": datetime.utcnow()},
+            }
+        return {
+            "$inc": {"ref_count": 1, f"owners.{holder}": 1},
+            "$set": {"updated_at": datetime.utcnow()},
+        }
+
+    def _not_held(self, holder: str, once: bool) -> dict:
+        return {f"owners.{holder}": {"$exists": False}} if once else {}
+
+    async def _add_reference(self, sha256: str, holder: str, once: bool, update: dict) -> Asset:
+        """Upsert a reference, waiting until any deletion of the same content is done.
+
+        Records being deleted are excluded from the match, so the upsert fails
+        with a duplicate key until the deleting record is gone.
+        """
+        while True:
+            try:
+                return await Asset.find_one(
+                    {"_id": sha256, "deleting": {"$ne": True}, **self._not_held(holder, once)}
+                ).update(
+                    update,
+                    upsert=True,
+                    response_type=UpdateResponse.NEW_DOCUMENT,
+                )
+            except DuplicateKeyError:
+                asset = await Asset.get(sha256)
+            if asset is not None and not asset.deleting:
+                # Stored and already referenced by this holder
+                return asset
+            if asset is not None and asset.updated_at < datetime.utcnow() - DELETE_STALE_AFTER:
+                await self._delete(asset)
+            else:
+                await asyncio.sleep(DELETE_POLL_INTERVAL)
+
+    async def _delete(self, asset: Asset) -> None:
+        """Unlink the file of a record marked ``deleting``, then drop the record."""
+        await storage_service.delete_file(asset.path)
+        await Asset.get_motor_collection().delete_one({"_id": asset.id, "deleting": True})
+
+    async def store(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        holder: str,
+        max_bytes: Optional[int] = None,
+        once: bool = False,
+        folder: Optional[str] = None,
+    ) -> Asset:
+        """Store a stream of chunks and add a reference for ``holder``.
+
+        When the content is already stored, the staged copy is dropped and only
+        the reference is recorded. ``folder`` is kept as a label on the asset;
+        it does not affect where the file is stored. Raises FileTooLargeError
+        over ``max_bytes``.
+        """
+        temp_path, sha256, size = await storage_service.stage(chunks, max_bytes)
+        try:
+            update = self._reference_update(holder, once)
+            if folder:
+                update["$addToSet"] = {"folders": folder}
+            update["$setOnInsert"] = {
+                "path": object_path(sha256, filename),
+                "size": size,
+                "content_type": mimetypes.guess_type(filename)[0],
+                "created_at": datetime.utcnow(),
+            }
+            asset = await self._add_reference(sha256, holder, once, update)
+            # Files of referenced records are never unlinked, so this cannot race a deletion
+            if not await storage_service.exists(asset.path):
+                await storage_service.commit(temp_path, asset.path, asset.content_type)
+        finally:
+            storage_service.discard(temp_path)
+
+        return asset
+
+    async def register(self, sha256: str, filename: str, size: int, holder: str) -> Asset:
+        """Add a reference for content already written to its object path.
+
+        For direct uploads, once the store has confirmed the content matches
+        ``sha256``.
+        """
+        update = self._reference_update(holder)
+        update["$setOnInsert"] = {
+            "path": object_path(sha256, filename),
+            "size": size,
+            "content_type": mimetypes.guess_type(filename)[0],
+            "created_at": datetime.utcnow(),
+        }
+        return await self._add_reference(sha256, holder, False, update)
+
+    async def store_bytes(self, content: bytes, filename: str, holder: str, once: bool = False) -> Asset:
+        """``store`` for content already in memory, skipping the write if it is stored."""
+        asset = await self.claim(hashlib.sha256(content).hexdigest(), holder, once)
+        if asset is not None:
+            return asset
+
+        async def chunks() -> AsyncIterator[bytes]:
+            yield content
+
+        return await self.store(chunks(), filename, holder, once=once)
+
+    async def claim(self, sha256: str, holder: str, once: bool = False) -> Optional[Asset]:
+        """Add a reference to already-stored content without uploading it again.
+
+        Returns None if no file with this digest is stored.
+        """
+        asset = await Asset.find_one({"_id": sha256, "deleting": {"$ne": True}, **self._not_held(holder, once)}).update(
+            self._reference_update(holder, once),
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+        if asset is None and once:
+            asset = await Asset.find_one({"_id": sha256, f"owners.{holder}": {"$gt": 0}})
+        if asset is None:
+            return None
+        if not await storage_service.exists(asset.path):
+            # The file went missing; undo the reference so it can be re-uploaded
+            await self.release(asset.path, holder)
+            return None
+        return asset
+
+    async def release(self, relative_path: str, holder: str) -> Optional[bool]:
+        """Drop one of ``holder``'s references to the file at ``relative_path``.
+
+        Returns None if the holder has no reference to it, otherwise whether
+        this was the last reference and the file was deleted.
+        """
+        collection = Asset.get_motor_collection()
+        asset = await Asset.find_one({"path": relative_path, f"owners.{holder}": {"$gt": 0}}).update(
+            {
+                "$inc": {"ref_count": -1, f"owners.{holder}": -1},
+                "$set": {"updated_at": datetime.utcnow()},
+            },
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+        if asset is None:
+            return None
+
+        if asset.owners.get(holder, 0) <= 0:
+            await collection.update_one(
+                {"_id": asset.id, f"owners.{holder}": {"$lte": 0}},
+                {"$unset": {f"owners.{holder}": ""}},
+            )
+        if asset.ref_count > 0:
+            return False
+
+        # Only delete if nobody claimed the file in the meantime; from here on
+        # new references wait until the record is gone
+        result = await collection.update_one(
+            {"_id": asset.id, "ref_count": {"$lte": 0}, "deleting": {"$ne": True}},
+            {"$set": {"deleting": True, "updated_at": datetime.utcnow()}},
+        )
+        if not result.modified_count:
+            return False
+        await self._delete(asset)
+        return True
+
+    async def hold(self, holder: str, paths: set[str]) -> None:
+        """Make ``holder`` reference each stored file at ``paths`` once.
+
+        Paths that are not stored files, or are already held, are ignored.
+        """
+        if not paths:
+            return
+        await Asset.get_motor_collection().update_many(
+            {"path": {"$in": sorted(paths)}, "deleting": {"$ne": True}, **self._not_held(holder, True)},
+            self._reference_update(holder, once=True),
+        )
+
+    async def release_unused(self, holder: str, paths: set[str]) -> int:
+        """Drop all of ``holder``'s references to stored files not at ``paths``.
+
+        Returns the number of files released.
+        """
+        released = 0
+        async for asset in Asset.find({f"owners.{holder}": {"$gt": 0}}):
+            if asset.path not in paths:
+                for _ in range(asset.owners[holder]):
+                    await self.release(asset.path, holder)
+                released += 1
+        return released
+
+
+# Singleton instance
+asset_service = AssetService()
@@ -0,0 +1,266 @@
+import asyncio
+import base64
+import binascii
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Any, Optional, Union
+
+from ..config import get_settings
+from ..models.project import Project
+from ..models.template import Template
+from ..schemas.job import CanvasAssetBackfillRequest
+from ..schemas.project import CanvasPatch
+from .canvas_storage import pack_canvas, unpack_canvas
+from .repository import version_filter
+from .asset_service import asset_service, canvas_holder, is_object_path
+from .storage_service import storage_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DATA_URL_PATTERN = re.compile(r"^data:(image/[a-z0-9.+-]+);base64,", re.IGNORECASE)
+
+CanvasModel = Union[type[Project], type[Template]]
+
+IMAGE_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "image/bmp": ".bmp",
+    "image/svg+xml": ".svg",
+}
+
+
+def _collect_data_urls(value: Any, found: set[str]) -> None:
+    if isinstance(value, str):
+        if len(value) >= settings.canvas_asset_min_bytes and DATA_URL_PATTERN.match(value):
+            found.add(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_data_urls(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_data_urls(item, found)
+
+
+def _collect_object_paths(value: Any, found: set[str]) -> None:
+    if isinstance(value, str):
+        if value.startswith(f"{storage_service.public_url_base}/"):
+            relative_path = storage_service.relative_path(value)
+            if is_object_path(relative_path):
+                found.add(relative_path)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_object_paths(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_object_paths(item, found)
+
+
+def has_inline_images(value: Any) -> bool:
+    """Whether ``externalize_images`` would have anything to move to storage."""
+    data_urls: set[str] = set()
+    _collect_data_urls(value, data_urls)
+    return bool(data_urls)
+
+
+def document_holder(model: CanvasModel, doc_id: str) -> str:
+    return canvas_holder(model.Settings.name, doc_id)
+
+
+def _replace(value: Any, urls: dict[str, str]) -> Any:
+    if isinstance(value, str):
+        return urls.get(value, value)
+    if isinstance(value, dict):
+        return {key: _replace(item, urls) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_replace(item, urls) for item in value]
+    return value
+
+
+async def store_data_url(data_url: str, holder: str) -> Optional[str]:
+    """Write an inline image to storage and return its URL.
+
+    Files are content-addressed, so the same image pasted into many canvases
+    is stored once, and ``holder`` references it at most once. Returns None
+    for unsupported types or invalid base64.
+    """
+    match = DATA_URL_PATTERN.match(data_url)
+    ext = IMAGE_EXTENSIONS.get(match.group(1).lower()) if match else None
+    if not ext:
+        return None
+
+    try:
+        content = await asyncio.to_thread(base64.b64decode, data_url[match.end():])
+    except (binascii.Error, ValueError):
+        return None
+
+    asset = await asset_service.store_bytes(content, f"image{ext}", holder, once=True)
+    return storage_service.url_for(asset.path)
+
+
+async def externalize_images(value: Any, holder: str) -> tuple[Any, int]:
+    """Replace inline ``data:`` images anywhere in ``value`` with storage URLs.
+
+    Returns the rewritten value (the input is not modified) and the number of
+    distinct images moved to storage. The files are referenced by ``holder``
+    (see ``document_holder``) before the canvas that uses them is written.
+    """
+    data_urls: set[str] = set()
+    _collect_data_urls(value, data_urls)
+    if not data_urls:
+        return value, 0
+
+    urls = {}
+    for data_url in data_urls:
+        url = await store_data_url(data_url, holder)
+        if url:
+            urls[data_url] = url
+
+    if not urls:
+        return value, 0
+    return _replace(value, urls), len(urls)
+
+
+async def externalize_patch_images(patch: CanvasPatch, holder: str) -> CanvasPatch:
+    """``externalize_images`` over every value carried by a canvas patch."""
+    rewritten, count = await externalize_images(patch.model_dump(by_alias=True), holder)
+    return CanvasPatch.model_validate(rewritten) if count else patch
+
+
+async def hold_canvas_assets(model: CanvasModel, doc_id: str, value: Any) -> None:
+    """Reference the stored files that a written canvas, or patch, points to.
+
+    Run after a successful write; a no-op when ``value`` has no storage URLs.
+    Saves only ever add references: files a canvas stops using are released
+    later by ``canvas_asset_service``.
+    """
+    paths: set[str] = set()
+    _collect_object_paths(value, paths)
+    await asset_service.hold(document_holder(model, doc_id), paths)
+
+
+class CanvasAssetService:
+    """Releases stored files that project and template canvases stopped using.
+
+    Releases never happen while a canvas is being saved: a concurrent save may
+    be about to write an image that an older read of the canvas does not
+    show. Instead they run per document once it has gone
+    ``canvas_asset_release_delay`` seconds without changes, and only if its
+    ``updated_at`` and revision are still the ones the canvas was read at.
+    """
+
+    def __init__(self):
+        self._waiting: dict[str, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def schedule(self, model: CanvasModel, doc_id: str) -> None:
+        """Release the images a saved canvas dropped once it stops changing."""
+        key = document_holder(model, doc_id)
+        waiting = self._waiting.pop(key, None)
+        if waiting:
+            waiting.cancel()
+
+        task = asyncio.create_task(self._release_later(model, doc_id, key))
+        self._waiting[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _release_later(self, model: CanvasModel, doc_id: str, key: str) -> None:
+        await asyncio.sleep(settings.canvas_asset_release_delay)
+        if self._waiting.get(key) is asyncio.current_task():
+            del self._waiting[key]
+
+        try:
+            await self.release_unused(model, doc_id)
+        except Exception:
+            logger.exception("Releasing images of %s failed", key)
+
+    async def release_unused(self, model: CanvasModel, doc_id: str) -> int:
+        """Release the stored files a document's canvas no longer uses.
+
+        Skipped (returning 0) for documents changed within
+        ``canvas_asset_release_delay`` seconds or while being read. Returns the
+        number of files released.
+        """
+        document = await model.get(doc_id)
+        if document is None:
+            return 0
+
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.canvas_asset_release_delay)
+        if document.updated_at > cutoff:
+            return 0
+
+        paths: set[str] = set()
+        _collect_object_paths(await unpack_canvas(document), paths)
+
+        # A save since the read may use images the read canvas does not
+        current = await model.get_motor_collection().find_one(
+            {"_id": doc_id}, {"updated_at": 1, "revision": 1}
+        )
+        if current is None:
+            return 0
+        if current["updated_at"] != document.updated_at or current["revision"] != document.revision:
+            return 0
+
+        return await asset_service.release_unused(document_holder(model, doc_id), paths)
+
+    async def remove(self, model: CanvasModel, doc_id: str) -> None:
+        """Release every stored file a deleted document referenced."""
+        waiting = self._waiting.pop(document_holder(model, doc_id), None)
+        if waiting:
+            waiting.cancel()
+
+        await asset_service.release_unused(document_holder(model, doc_id), set())
+
+
+# Singleton instance
+canvas_asset_service = CanvasAssetService()
+
+
+async def backfill_canvas_assets(request: CanvasAssetBackfillRequest, user_id: str) -> dict[str, Any]:
+    """Move inline images out of a user's stored projects and templates.
+
+    Each document is rewritten only if its revision is unchanged since it was
+    read; documents edited meanwhile are counted as conflicts and left for
+    their next save. ``updated_at`` is kept so listings do not reorder. Every
+    document then references the stored files its canvas uses, and releases
+    the ones it dropped if it has not changed for
+    ``canvas_asset_release_delay`` seconds.
+    """
+    models = {"projects": Project, "templates": Template}
+    summary = {}
+
+    for name in request.collections:
+        model = models[name]
+        counts = {"scanned": 0, "updated": 0, "images": 0, "conflicts": 0, "released": 0}
+
+        async for document in model.find({"user_id": user_id}):
+            counts["scanned"] += 1
+            canvas_data, images = await externalize_images(
+                await unpack_canvas(document), document_holder(model, document.id)
+            )
+            if images:
+                inc = {"revision": 1}
+                if model is Project:
+                    inc["canvas_version"] = 1
+
+                result = await model.get_motor_collection().update_one(
+                    {"_id": document.id, **version_filter("revision", document.revision)},
+                    {"$set": await pack_canvas(canvas_data), "$inc": inc},
+                )
+                if result.modified_count:
+                    counts["updated"] += 1
+                    counts["images"] += images
+                else:
+                    counts["conflicts"] += 1
+            await hold_canvas_assets(model, document.id, canvas_data)
+            counts["released"] += await canvas_asset_service.release_unused(model, document.id)
+
+        summary[name] = counts
+
+    return summary
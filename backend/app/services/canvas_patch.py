@@ -0,0 +1,270 @@
+import copy
+from typing import Any, Optional
+
+from ..schemas.project import CanvasPatch, CanvasPatchOperation
+
+# Field holding the canvas inside the project document, and fabric's object list
+CANVAS_FIELD = "canvas_data"
+OBJECTS_KEY = "objects"
+
+
+class CanvasPatchError(ValueError):
+    """The patch is malformed or does not apply to the current canvas."""
+
+
+class CanvasPatchTestFailed(CanvasPatchError):
+    """A JSON Patch ``test`` operation did not match the current canvas."""
+
+
+def parse_pointer(path: str) -> list[str]:
+    """Split an RFC 6901 JSON Pointer into unescaped reference tokens."""
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise CanvasPatchError(f"Invalid JSON Pointer: {path!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")]
+
+
+def _is_index(token: str) -> bool:
+    return token.isdigit() and (token == "0" or not token.startswith("0"))
+
+
+def _is_field_name(token: str) -> bool:
+    """Whether a token can be used verbatim as a Mongo dotted-path segment."""
+    return bool(token) and "." not in token and not token.startswith("$")
+
+
+def _conflicts(a: tuple[str, ...], b: tuple[str, ...]) -> bool:
+    """Whether two update paths overlap (one is a prefix of the other).
+
+    Array filter segments (``$[...]``) may resolve to any element, so they are
+    treated as matching any segment in the same position.
+    """
+    for x, y in zip(a, b):
+        if x != y and not (x.startswith("$[") or y.startswith("$[")):
+            return False
+    return True
+
+
+class _UpdateBuilder:
+    """Accumulates non-overlapping Mongo update operators for a canvas patch."""
+
+    def __init__(self):
+        self.update: dict[str, dict[str, Any]] = {}
+        self.conditions: dict[str, Any] = {}
+        self.array_filters: list[dict[str, Any]] = []
+        self._paths: list[tuple[str, ...]] = []
+
+    def add(self, operator: str, segments: list[str], value: Any) -> bool:
+        path = (CANVAS_FIELD, *segments)
+        if any(_conflicts(path, existing) for existing in self._paths):
+            return False
+        self._paths.append(path)
+        self.update.setdefault(operator, {})[".".join(path)] = value
+        return True
+
+    def require(self, segments: list[str], condition: Any = None) -> None:
+        """Only apply the update if ``segments`` exists (or matches ``condition``).
+
+        Keeps Mongo from creating missing parents or padding arrays with nulls.
+        """
+        if segments:
+            path = ".".join((CANVAS_FIELD, *segments))
+            self.conditions[path] = {"$exists": True} if condition is None else condition
+
+    def array_filter(self, key: str, value: Any) -> str:
+        identifier = f"o{len(self.array_filters)}"
+        self.array_filters.append({f"{identifier}.{key}": value})
+        return f"$[{identifier}]"
+
+
+def _compile_operation(builder: _UpdateBuilder, operation: CanvasPatchOperation) -> bool:
+    segments = parse_pointer(operation.path)
+    if not all(_is_field_name(token) for token in segments):
+        return False
+    if len(segments) > 1 and segments[0] == OBJECTS_KEY and not (_is_index(segments[1]) or segments[1] == "-"):
+        # Mongo rejects field names under an array; let apply_patch report it
+        return False
+
+    if operation.op == "replace":
+        builder.require(segments)
+        return builder.add("$set", segments, operation.value)
+
+    if operation.op == "add":
+        if segments and segments[-1] == "-":
+            builder.require(segments[:-1])
+            return builder.add("$push", segments[:-1], {"$each": [operation.value]})
+        if segments and _is_index(segments[-1]):
+            # Inserting mid-array shifts the following elements
+            return False
+        builder.require(segments[:-1])
+        return builder.add("$set", segments, operation.value)
+
+    if operation.op == "remove":
+        if not segments or _is_index(segments[-1]):
+            # Removing an array element by index has no single-operator form
+            return False
+        builder.require(segments)
+        return builder.add("$unset", segments, "")
+
+    # test, move and copy need the current value
+    return False
+
+
+def compile_patch(
+    patch: CanvasPatch,
+) -> Optional[tuple[dict[str, Any], dict[str, Any], list[dict[str, Any]]]]:
+    """Translate a patch into one targeted Mongo update.
+
+    Returns the update document, the filter conditions under which it applies
+    as written (the paths it edits exist) and its array filters. Returns None
+    when the patch cannot be expressed as a single update with non-overlapping
+    paths; such patches are applied with ``apply_patch`` instead.
+    """
+    builder = _UpdateBuilder()
+
+    for operation in patch.operations:
+        if not _compile_operation(builder, operation):
+            return None
+
+    for key, value in patch.properties.items():
+        if not _is_field_name(key) or not builder.add("$set", [key], value):
+            return None
+
+    object_ids = {delta.id for delta in patch.objects if delta.id is not None}
+    if object_ids:
+        builder.require([OBJECTS_KEY, "id"], {"$all": sorted(object_ids)})
+
+    for delta in patch.objects:
+        if delta.id is not None:
+            element = builder.array_filter("id", delta.id)
+        else:
+            element = str(delta.index)
+            builder.require([OBJECTS_KEY, element])
+        for key, value in delta.changes.items():
+            if not _is_field_name(key) or not builder.add("$set", [OBJECTS_KEY, element, key], value):
+                return None
+
+    if patch.added_objects:
+        if not builder.add("$push", [OBJECTS_KEY], {"$each": patch.added_objects}):
+            return None
+
+    if patch.removed_object_ids:
+        if not builder.add("$pull", [OBJECTS_KEY], {"id": {"$in": patch.removed_object_ids}}):
+            return None
+
+    return builder.update, builder.conditions, builder.array_filters
+
+
+def _resolve(document: Any, segments: list[str], path: str) -> Any:
+    target = document
+    for token in segments:
+        if isinstance(target, dict) and token in target:
+            target = target[token]
+        elif isinstance(target, list) and _is_index(token) and int(token) < len(target):
+            target = target[int(token)]
+        else:
+            raise CanvasPatchError(f"Path not found: {path}")
+    return target
+
+
+def _add(document: Any, segments: list[str], value: Any, path: str) -> Any:
+    if not segments:
+        return value
+    parent = _resolve(document, segments[:-1], path)
+    token = segments[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list) and token == "-":
+        parent.append(value)
+    elif isinstance(parent, list) and _is_index(token) and int(token) <= len(parent):
+        parent.insert(int(token), value)
+    else:
+        raise CanvasPatchError(f"Path not found: {path}")
+    return document
+
+
+def _remove(document: Any, segments: list[str], path: str) -> Any:
+    if not segments:
+        raise CanvasPatchError("Cannot remove the whole canvas")
+    parent = _resolve(document, segments[:-1], path)
+    _resolve(parent, segments[-1:], path)
+    if isinstance(parent, dict):
+        return parent.pop(segments[-1])
+    return parent.pop(int(segments[-1]))
+
+
+def _apply_operation(document: Any, operation: CanvasPatchOperation) -> Any:
+    segments = parse_pointer(operation.path)
+
+    if operation.op == "test":
+        if _resolve(document, segments, operation.path) != operation.value:
+            raise CanvasPatchTestFailed(f"Test failed at {operation.path}")
+        return document
+
+    if operation.op == "add":
+        return _add(document, segments, copy.deepcopy(operation.value), operation.path)
+
+    if operation.op == "remove":
+        _remove(document, segments, operation.path)
+        return document
+
+    if operation.op == "replace":
+        _resolve(document, segments, operation.path)
+        if not segments:
+            return copy.deepcopy(operation.value)
+        _remove(document, segments, operation.path)
+        return _add(document, segments, copy.deepcopy(operation.value), operation.path)
+
+    if operation.from_ is None:
+        raise CanvasPatchError(f"'{operation.op}' requires 'from'")
+    source = parse_pointer(operation.from_)
+
+    if operation.op == "copy":
+        value = copy.deepcopy(_resolve(document, source, operation.from_))
+        return _add(document, segments, value, operation.path)
+
+    # move
+    if segments[:len(source)] == source and segments != source:
+        raise CanvasPatchError("Cannot move a value into one of its children")
+    value = _remove(document, source, operation.from_)
+    return _add(document, segments, value, operation.path)
+
+
+def apply_patch(canvas_data: dict[str, Any], patch: CanvasPatch) -> dict[str, Any]:
+    """Apply a patch to a copy of ``canvas_data`` and return the result.
+
+    JSON Patch operations run first, in order, followed by the object-level
+    deltas. Raises CanvasPatchError if any part does not apply.
+    """
+    document: Any = copy.deepcopy(canvas_data)
+
+    for operation in patch.operations:
+        document = _apply_operation(document, operation)
+
+    if not isinstance(document, dict):
+        raise CanvasPatchError("Canvas data must remain an object")
+
+    document.update(copy.deepcopy(patch.properties))
+
+    objects = document.setdefault(OBJECTS_KEY, [])
+    if not isinstance(objects, list):
+        raise CanvasPatchError(f"'{OBJECTS_KEY}' is not a list")
+
+    for delta in patch.objects:
+        if delta.id is not None:
+            targets = [o for o in objects if isinstance(o, dict) and o.get("id") == delta.id]
+        elif delta.index < len(objects) and isinstance(objects[delta.index], dict):
+            targets = [objects[delta.index]]
+        else:
+            raise CanvasPatchError(f"No canvas object at index {delta.index}")
+        for target in targets:
+            target.update(copy.deepcopy(delta.changes))
+
+    objects.extend(copy.deepcopy(patch.added_objects))
+
+    if patch.removed_object_ids:
+        removed = set(patch.removed_object_ids)
+        objects[:] = [o for o in objects if not (isinstance(o, dict) and o.get("id") in removed)]
+
+    return document
@@ -0,0 +1,227 @@
+import base64
+import binascii
+import io
+import os
+import re
+from typing import Any, Optional
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+# Objects are drawn at this multiple of the output size and scaled down,
+# which antialiases shape edges
+SUPERSAMPLE = 2
+
+FORMATS = {"webp": "WEBP", "png": "PNG"}
+
+TEXT_TYPES = {"text", "i-text", "textbox"}
+
+# CSS rgba()/hsla() with a 0-1 alpha, which ImageColor does not accept
+_ALPHA_COLOR = re.compile(r"^((?:rgb|hsl)a?)\((.*),\s*([\d.]+%?)\s*\)$", re.IGNORECASE)
+
+
+def _color(value: Any, opacity: float) -> Optional[tuple[int, int, int, int]]:
+    """RGBA for a fabric color (CSS string or gradient), or None if transparent."""
+    if isinstance(value, dict):
+        # Gradients are approximated by their first stop
+        stops = value.get("colorStops") or []
+        value = stops[0].get("color") if stops and isinstance(stops[0], dict) else None
+    if not isinstance(value, str) or value in ("", "transparent", "none"):
+        return None
+    match = _ALPHA_COLOR.match(value.strip())
+    if match and match.group(2).count(",") == 2:
+        # Split off the alpha and parse the remaining rgb()/hsl() color
+        alpha = match.group(3)
+        opacity *= float(alpha[:-1]) / 100 if alpha.endswith("%") else float(alpha)
+        value = f"{match.group(1).lower().rstrip('a')}({match.group(2)})"
+    try:
+        rgba = ImageColor.getcolor(value, "RGBA")
+    except ValueError:
+        return None
+    alpha = round(rgba[3] * max(0.0, min(1.0, opacity)))
+    return (*rgba[:3], alpha) if alpha else None
+
+
+def _number(obj: dict[str, Any], key: str, default: float = 0.0) -> float:
+    value = obj.get(key, default)
+    return float(value) if isinstance(value, (int, float)) else default
+
+
+def _box(obj: dict[str, Any], width: float, height: float, scale: float) -> tuple[float, float, float, float]:
+    """Output-space bounding box of an object, resolving fabric's origin point."""
+    left, top = _number(obj, "left"), _number(obj, "top")
+    offset_x = {"center": 0.5, "right": 1.0}.get(obj.get("originX"), 0.0)
+    offset_y = {"center": 0.5, "bottom": 1.0}.get(obj.get("originY"), 0.0)
+    x0 = (left - width * offset_x) * scale
+    y0 = (top - height * offset_y) * scale
+    return x0, y0, x0 + width * scale, y0 + height * scale
+
+
+def _font(size: float, bold: bool) -> ImageFont.FreeTypeFont:
+    size = max(1, round(size))
+    try:
+        return ImageFont.truetype("DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+
+def _wrap(text: str, font: ImageFont.FreeTypeFont, width: float) -> list[str]:
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if line and font.getlength(candidate) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def _draw_shape(draw: ImageDraw.ImageDraw, obj: dict[str, Any], scale: float, opacity: float) -> None:
+    sx, sy = _number(obj, "scaleX", 1.0), _number(obj, "scaleY", 1.0)
+    if obj.get("type") == "circle":
+        width = height = 2 * _number(obj, "radius")
+    else:
+        width, height = _number(obj, "width"), _number(obj, "height")
+    box = _box(obj, width * sx, height * sy, scale)
+
+    fill = _color(obj.get("fill"), opacity)
+    stroke = _color(obj.get("stroke"), opacity)
+    stroke_width = round(_number(obj, "strokeWidth", 1.0) * scale) if stroke else 0
+
+    if obj.get("type") == "circle":
+        draw.ellipse(box, fill=fill, outline=stroke, width=stroke_width)
+    elif obj.get("rx") or obj.get("ry"):
+        radius = max(_number(obj, "rx") * sx, _number(obj, "ry") * sy) * scale
+        draw.rounded_rectangle(box, radius=radius, fill=fill, outline=stroke, width=stroke_width)
+    else:
+        draw.rectangle(box, fill=fill, outline=stroke, width=stroke_width)
+
+
+def _draw_text(draw: ImageDraw.ImageDraw, obj: dict[str, Any], scale: float, opacity: float) -> None:
+    fill = _color(obj.get("fill", "#000000"), opacity)
+    text = obj.get("text")
+    if fill is None or not isinstance(text, str) or not text:
+        return
+
+    sx, sy = _number(obj, "scaleX", 1.0), _number(obj, "scaleY", 1.0)
+    font_size = _number(obj, "fontSize", 40.0)
+    bold = str(obj.get("fontWeight", "normal")) in ("bold", "600", "700", "800", "900")
+    font = _font(font_size * sy * scale, bold)
+    line_height = font_size * _number(obj, "lineHeight", 1.16) * sy * scale
+
+    if obj.get("type") == "textbox" and _number(obj, "width"):
+        block_width = _number(obj, "width") * sx
+        lines = _wrap(text, font, block_width * scale)
+        widths = [font.getlength(line) for line in lines]
+    else:
+        lines = text.split("\n")
+        widths = [font.getlength(line) for line in lines]
+        block_width = max(widths) / scale
+    box = _box(obj, block_width, len(lines) * line_height / scale, scale)
+
+    align = obj.get("textAlign", "left")
+    for i, (line, line_width) in enumerate(zip(lines, widths)):
+        x = box[0]
+        if align == "center":
+            x += (box[2] - box[0] - line_width) / 2
+        elif align == "right":
+            x = box[2] - line_width
+        draw.text((x, box[1] + i * line_height), line, font=font, fill=fill)
+
+
+def _load_image(src: Any, images: dict[str, str]) -> Optional[Image.Image]:
+    if not isinstance(src, str):
+        return None
+    try:
+        if src.startswith("data:"):
+            return Image.open(io.BytesIO(base64.b64decode(src.split(",", 1)[1])))
+        if src in images:
+            return Image.open(images[src])
+    except (OSError, ValueError, IndexError, binascii.Error, Image.DecompressionBombError):
+        return None
+    return None
+
+
+def _draw_image(canvas: Image.Image, obj: dict[str, Any], scale: float, opacity: float, images: dict[str, str]) -> None:
+    source = _load_image(obj.get("src"), images)
+    if source is None:
+        return
+
+    with source:
+        sx, sy = _number(obj, "scaleX", 1.0), _number(obj, "scaleY", 1.0)
+        width = _number(obj, "width", source.width) or source.width
+        height = _number(obj, "height", source.height) or source.height
+        x0, y0, x1, y1 = _box(obj, width * sx, height * sy, scale)
+        size = (max(1, round(x1 - x0)), max(1, round(y1 - y0)))
+
+        # Decode no more pixels than will be drawn
+        source.draft("RGB", size)
+        layer = source.convert("RGBA").resize(size, Image.LANCZOS)
+
+    if opacity < 1:
+        layer.putalpha(layer.getchannel("A").point(lambda a: round(a * opacity)))
+    canvas.alpha_composite(layer, (round(x0), round(y0)))
+
+
+def render_canvas(
+    canvas_data: dict[str, Any],
+    canvas_width: int,
+    canvas_height: int,
+    width: int,
+    images: Optional[dict[str, str]] = None,
+) -> Image.Image:
+    """Rasterize a fabric.js canvas to an image ``width`` pixels wide.
+
+    Supports the objects the backend itself produces: ``rect``, ``circle``,
+    ``text``/``i-text``/``textbox`` and ``image`` (``data:`` URLs, or sources
+    mapped to local files in ``images``). Position, origin, scale, fill,
+    stroke and opacity are honoured; rotation, groups, filters and other
+    object types are skipped.
+    """
+    images = images or {}
+    height = max(1, round(width * canvas_height / canvas_width))
+    scale = width * SUPERSAMPLE / canvas_width
+
+    background = _color(canvas_data.get("background"), 1.0) or (255, 255, 255, 255)
+    canvas = Image.new("RGBA", (width * SUPERSAMPLE, height * SUPERSAMPLE), background)
+    draw = ImageDraw.Draw(canvas, "RGBA")
+
+    objects = canvas_data.get("objects")
+    for obj in objects if isinstance(objects, list) else []:
+        if not isinstance(obj, dict) or obj.get("visible") is False:
+            continue
+        opacity = _number(obj, "opacity", 1.0)
+        kind = obj.get("type")
+        if kind in ("rect", "circle"):
+            _draw_shape(draw, obj, scale, opacity)
+        elif kind in TEXT_TYPES:
+            _draw_text(draw, obj, scale, opacity)
+        elif kind == "image":
+            _draw_image(canvas, obj, scale, opacity, images)
+
+    return canvas.resize((width, height), Image.LANCZOS)
+
+
+def render_canvas_file(
+    canvas_data: dict[str, Any],
+    canvas_width: int,
+    canvas_height: int,
+    width: int,
+    images: dict[str, str],
+    destination: str,
+    fmt: str,
+) -> None:
+    """``render_canvas`` to a file, renamed into place once written.
+
+    Runs in a worker process.
+    """
+    image = render_canvas(canvas_data, canvas_width, canvas_height, width, images)
+    if fmt != "png":
+        image = image.convert("RGB")
+
+    temp = f"{destination}.{os.getpid()}.part"
+    image.save(temp, FORMATS[fmt])
+    os.replace(temp, destination)
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import zlib
+from collections import Counter
+from typing import Any
+
+from ..config import get_settings
+
+try:
+    import zstandard
+except ImportError:  # Optional; zlib is used unless CANVAS_COMPRESSION=zstd
+    zstandard = None
+
+settings = get_settings()
+
+# Fields written together whenever a canvas is stored
+CANVAS_STORAGE_FIELDS = ("canvas_data", "canvas_blob", "canvas_encoding", "canvas_summary")
+
+
+def summarize_canvas(canvas_data: dict[str, Any], raw_size: int) -> dict[str, Any]:
+    """Small uncompressed description of a compressed canvas."""
+    objects = canvas_data.get("objects")
+    objects = objects if isinstance(objects, list) else []
+    types = Counter(o.get("type", "unknown") for o in objects if isinstance(o, dict))
+    return {
+        "version": canvas_data.get("version"),
+        "background": canvas_data.get("background"),
+        "object_count": len(objects),
+        "object_types": dict(types),
+        "raw_size": raw_size,
+    }
+
+
+def _compress(raw: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("CANVAS_COMPRESSION=zstd requires the zstandard package")
+        return zstandard.ZstdCompressor(level=settings.canvas_compression_level).compress(raw)
+    return zlib.compress(raw, settings.canvas_compression_level)
+
+
+def _decompress(blob: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Canvas stored with zstd but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if encoding == "zlib":
+        return zlib.decompress(blob)
+    raise ValueError(f"Unknown canvas encoding: {encoding}")
+
+
+def encode_canvas(canvas_data: dict[str, Any]) -> dict[str, Any]:
+    """Storage fields for a canvas, compressed if its JSON exceeds the threshold.
+
+    Small canvases stay inline in ``canvas_data``; large ones are stored as a
+    compressed ``canvas_blob`` with an empty ``canvas_data`` and a summary.
+    """
+    encoding = settings.canvas_compression
+    raw = json.dumps(canvas_data, separators=(",", ":")).encode("utf-8")
+
+    if encoding == "none" or len(raw) < settings.canvas_compression_threshold:
+        return {
+            "canvas_data": canvas_data,
+            "canvas_blob": None,
+            "canvas_encoding": None,
+            "canvas_summary": None,
+        }
+
+    return {
+        "canvas_data": {},
+        "canvas_blob": _compress(raw, encoding),
+        "canvas_encoding": encoding,
+        "canvas_summary": summarize_canvas(canvas_data, len(raw)),
+    }
+
+
+def decode_canvas(document: Any) -> dict[str, Any]:
+    """The full canvas of a Project or Template, decompressing if needed."""
+    if document.canvas_blob is None:
+        return document.canvas_data
+    return json.loads(_decompress(document.canvas_blob, document.canvas_encoding))
+
+
+async def pack_canvas(canvas_data: dict[str, Any]) -> dict[str, Any]:
+    """``encode_canvas`` off the event loop."""
+    return await asyncio.to_thread(encode_canvas, canvas_data)
+
+
+async def unpack_canvas(document: Any) -> dict[str, Any]:
+    """``decode_canvas`` off the event loop for compressed canvases."""
+    if document.canvas_blob is None:
+        return document.canvas_data
+    return await asyncio.to_thread(decode_canvas, document)
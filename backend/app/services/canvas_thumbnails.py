@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from typing import Any, Union
+
+from ..config import get_settings
+from ..models.project import Project
+from ..models.template import Template
+from .canvas_render import render_canvas_file
+from .canvas_storage import unpack_canvas
+from .process_pool import image_pool
+from .storage_service import storage_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Rendered previews live at thumbnails/<collection>/<id>.<format>
+THUMBNAILS_FOLDER = "thumbnails"
+
+CanvasModel = Union[type[Project], type[Template]]
+
+# Changing any of these invalidates the rendered preview
+RENDERED_FIELDS = {"canvas_data", "format_width", "format_height"}
+
+
+def thumbnail_path(model: CanvasModel, doc_id: str) -> str:
+    return f"{THUMBNAILS_FOLDER}/{model.Settings.name}/{doc_id}.{settings.canvas_thumbnail_format}"
+
+
+def thumbnail_url(model: CanvasModel, doc_id: str) -> str:
+    """Stable URL of the server-rendered preview of a project or template.
+
+    The file is replaced in place on every render, so the URL can be stored
+    on the document once, in the same write as the canvas.
+    """
+    return storage_service.url_for(thumbnail_path(model, doc_id))
+
+
+async def _local_images(value: Any, found: dict[str, str]) -> None:
+    """Map image sources that point into our storage to local copies of their files."""
+    if isinstance(value, dict):
+        src = value.get("src")
+        if value.get("type") == "image" and isinstance(src, str) and src not in found:
+            local_path = await storage_service.fetch_file(src)
+            if local_path:
+                found[src] = str(local_path)
+        for item in value.values():
+            await _local_images(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            await _local_images(item, found)
+
+
+class CanvasThumbnailService:
+    """Renders project and template previews after their canvas is saved.
+
+    Renders are debounced per document: saves arriving within
+    ``canvas_thumbnail_debounce`` seconds of each other produce one render of
+    the latest canvas. Rendering runs in the image process pool.
+    """
+
+    def __init__(self):
+        self._waiting: dict[str, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def schedule(self, model: CanvasModel, doc_id: str) -> None:
+        """Re-render a document's preview once its canvas stops changing."""
+        key = thumbnail_path(model, doc_id)
+        waiting = self._waiting.pop(key, None)
+        if waiting:
+            waiting.cancel()
+
+        task = asyncio.create_task(self._refresh(model, doc_id, key))
+        self._waiting[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, model: CanvasModel, doc_id: str, key: str) -> None:
+        await asyncio.sleep(settings.canvas_thumbnail_debounce)
+        # From here on, a newer save schedules another render instead of cancelling this one
+        if self._waiting.get(key) is asyncio.current_task():
+            del self._waiting[key]
+
+        try:
+            await self.render(model, doc_id)
+        except Exception:
+            logger.exception("Thumbnail for %s failed", key)
+
+    async def render(self, model: CanvasModel, doc_id: str) -> bool:
+        """Render a document's current canvas to its thumbnail file.
+
+        Returns False if the document no longer exists.
+        """
+        document = await model.get(doc_id)
+        if document is None:
+            return False
+
+        canvas_data = await unpack_canvas(document)
+        images: dict[str, str] = {}
+        await _local_images(canvas_data, images)
+
+        staged = storage_service.temp_path(f".{settings.canvas_thumbnail_format}")
+        try:
+            await image_pool.run(
+                render_canvas_file,
+                canvas_data,
+                max(1, document.format_width),
+                max(1, document.format_height),
+                settings.canvas_thumbnail_width,
+                images,
+                str(staged),
+                settings.canvas_thumbnail_format,
+            )
+            await storage_service.commit(
+                staged, thumbnail_path(model, doc_id), f"image/{settings.canvas_thumbnail_format}"
+            )
+        finally:
+            storage_service.discard(staged)
+        return True
+
+    async def remove(self, model: CanvasModel, doc_id: str) -> None:
+        """Cancel any pending render and delete the thumbnail of a deleted document."""
+        key = thumbnail_path(model, doc_id)
+        waiting = self._waiting.pop(key, None)
+        if waiting:
+            waiting.cancel()
+
+        await storage_service.delete_file(key)
+
+
+# Singleton instance
+canvas_thumbnail_service = CanvasThumbnailService()
@@ -0,0 +1,77 @@
+import hashlib
+from datetime import datetime
+from typing import Optional, Iterable
+
+from fastapi import Response, status
+
+ETAG_HEADER = "ETag"
+CACHE_CONTROL_HEADER = "Cache-Control"
+
+# Per-user responses: browsers may keep them but must revalidate with the ETag
+PRIVATE_REVALIDATE = "private, no-cache"
+
+# Responses whose URL changes whenever their content does
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def public_cache_control(max_age: float) -> str:
+    return f"public, max-age={int(max_age)}"
+
+
+def revision_etag(revision: int) -> str:
+    """Strong ETag for a document at ``revision``."""
+    return f'"r{revision}"'
+
+
+def _timestamp(updated_at: datetime) -> str:
+    # Mongo stores datetimes with millisecond precision
+    return updated_at.strftime("%Y%m%d%H%M%S") + f"{updated_at.microsecond // 1000:03d}"
+
+
+def timestamp_etag(updated_at: datetime) -> str:
+    """Strong ETag for a document last written at ``updated_at``."""
+    return f'"t{_timestamp(updated_at)}"'
+
+
+def list_etag(items: Iterable[tuple[str, datetime]]) -> str:
+    """Strong ETag for an ordered list of ``(id, updated_at)`` pairs."""
+    digest = hashlib.sha256()
+    for doc_id, updated_at in items:
+        digest.update(f"{doc_id}@{_timestamp(updated_at)};".encode("utf-8"))
+    return f'"l{digest.hexdigest()[:32]}"'
+
+
+def _parse_tags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if not if_none_match:
+        return False
+    tags = [tag.removeprefix("W/") for tag in _parse_tags(if_none_match)]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[list[int]]:
+    """Revisions accepted by an ``If-Match`` header.
+
+    Returns None when the header is absent or ``*`` (any existing document).
+    Weak and foreign tags never match, so they contribute no revision.
+    """
+    if not if_match:
+        return None
+    tags = _parse_tags(if_match)
+    if "*" in tags:
+        return None
+    return [
+        int(tag[2:-1]) for tag in tags
+        if tag.startswith('"r') and tag.endswith('"') and tag[2:-1].isdigit()
+    ]
+
+
+def not_modified(etag: str, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={ETAG_HEADER: etag, CACHE_CONTROL_HEADER: cache_control},
+    )
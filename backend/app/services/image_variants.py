@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+
+from PIL import Image, ImageOps
+
+from ..config import get_settings
+from .ai_rate_limiter import TokenBucket
+from .asset_service import OBJECTS_FOLDER
+from .process_pool import image_pool
+from .storage_service import storage_service
+
+try:
+    import pillow_avif  # noqa: F401  Registers the AVIF plugin with Pillow
+except ImportError:  # Optional; AVIF variants are skipped without it
+    pillow_avif = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Generated variants live under variants/<aa>/<bb>/<key>/<width>.<format>
+VARIANTS_FOLDER = "variants"
+
+# Folders whose files never change in place: content-addressed files and
+# UUID-named uploads from before deduplication
+SOURCE_FOLDERS = {OBJECTS_FOLDER, "assets"}
+
+# Pillow save format names
+FORMATS = {"webp": "WEBP", "avif": "AVIF"}
+
+# Source types Pillow can decode
+RASTER_TYPES = {
+    "image/png",
+    "image/jpeg",
+    "image/gif",
+    "image/webp",
+    "image/avif",
+    "image/bmp",
+    "image/tiff",
+}
+
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+class UnsupportedImageError(ValueError):
+    """The source file could not be decoded as an image."""
+
+
+class RenderLimitError(Exception):
+    """Too many variants were requested that are not cached yet."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Too many image variants requested")
+        self.retry_after = retry_after
+
+
+def supported_formats() -> list[str]:
+    """Configured variant formats that this Pillow build can encode."""
+    Image.init()
+    return [fmt for fmt in settings.image_variant_formats if FORMATS.get(fmt) in Image.SAVE]
+
+
+def is_raster(relative_path: str) -> bool:
+    return mimetypes.guess_type(relative_path)[0] in RASTER_TYPES
+
+
+def is_resizable(relative_path: str) -> bool:
+    """Whether variants of a stored file can be made and cached for good.
+
+    Only folders whose files never change are allowed; previews, variants and
+    staged or cached files are not resize sources.
+    """
+    return is_raster(relative_path) and relative_path.split("/")[0] in SOURCE_FOLDERS
+
+
+def _variants_dir(relative_path: str) -> str:
+    key = hashlib.sha256(relative_path.encode("utf-8")).hexdigest()
+    return f"{VARIANTS_FOLDER}/{key[:2]}/{key[2:4]}/{key}"
+
+
+def variant_path(relative_path: str, width: int, fmt: str) -> str:
+    """Storage path of the ``width``-pixel ``fmt`` variant of a stored image."""
+    return f"{_variants_dir(relative_path)}/{width}.{fmt}"
+
+
+def render_variant(source: str, destination: str, width: int, fmt: str, quality: int) -> None:
+    """Write ``source`` scaled down to at most ``width`` pixels wide as ``fmt``.
+
+    Runs in a worker process. Images are never scaled up, EXIF orientation is
+    applied, and the file is renamed into place once fully written.
+    """
+    with Image.open(source) as image:
+        # Bound the stored height for images that are rotated on display
+        transposed = image.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS
+        # thumbnail() decodes JPEGs at reduced scale when it can
+        image.thumbnail((image.width, width) if transposed else (width, image.height), Image.LANCZOS)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+        temp = f"{destination}.{os.getpid()}.part"
+        image.save(temp, FORMATS[fmt], quality=quality)
+    os.replace(temp, destination)
+
+
+class ImageVariantService:
+    """Resized WebP/AVIF copies of stored images, cached in storage.
+
+    Variants are rendered in the image process pool and stored next to each
+    other under ``variants/``; concurrent requests for the same variant share
+    one render.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, asyncio.Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._renders = TokenBucket(settings.image_variant_render_rps, settings.image_variant_render_burst)
+
+    async def _render(self, relative_path: str, destination: str, width: int, fmt: str) -> None:
+        source = await storage_service.local_file(relative_path)
+        if source is None:
+            raise FileNotFoundError(relative_path)
+
+        staged = storage_service.temp_path(f".{fmt}")
+        try:
+            await image_pool.run(
+                render_variant,
+                str(source),
+                str(staged),
+                width,
+                fmt,
+                settings.image_variant_quality,
+            )
+            await storage_service.commit(staged, destination, f"image/{fmt}")
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            raise UnsupportedImageError(f"Cannot resize {relative_path}") from e
+        finally:
+            storage_service.discard(staged)
+
+    async def get(self, relative_path: str, width: int, fmt: str, throttle: bool = False) -> str:
+        """Storage path of a variant, rendering it first if it is not cached.
+
+        Raises FileNotFoundError if the source is missing and
+        UnsupportedImageError if it cannot be decoded. With ``throttle``,
+        renders that are not already running are rate limited and raise
+        RenderLimitError when over the limit.
+        """
+        if not await storage_service.exists(relative_path):
+            raise FileNotFoundError(relative_path)
+
+        destination = variant_path(relative_path, width, fmt)
+        if await storage_service.exists(destination):
+            return destination
+
+        render = self._pending.get(destination)
+        if render is None:
+            if throttle and (retry_after := self._renders.try_acquire()) > 0:
+                raise RenderLimitError(retry_after)
+            render = asyncio.ensure_future(self._render(relative_path, destination, width, fmt))
+            self._pending[destination] = render
+            render.add_done_callback(lambda _: self._pending.pop(destination, None))
+
+        # One caller disconnecting must not cancel the render for the others
+        await asyncio.shield(render)
+        return destination
+
+    async def generate(self, relative_path: str) -> None:
+        """Render every configured width and format of an image."""
+        for width in settings.image_variant_widths:
+            for fmt in supported_formats():
+                await self.get(relative_path, width, fmt)
+
+    def schedule(self, relative_path: str) -> None:
+        """Generate variants of a newly stored image in the background."""
+        if not is_resizable(relative_path):
+            return
+
+        async def run() -> None:
+            try:
+                await self.generate(relative_path)
+            except (FileNotFoundError, UnsupportedImageError):
+                logger.info("Skipped image variants for %s", relative_path)
+            except Exception:
+                logger.exception("Image variants for %s failed", relative_path)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def remove(self, relative_path: str) -> None:
+        """Delete all cached variants of an image."""
+        variants_dir = storage_service.driver.local_path(_variants_dir(relative_path))
+        if variants_dir is not None:
+            shutil.rmtree(variants_dir, ignore_errors=True)
+            return
+
+        # Object stores have no directories to remove
+        for width in settings.image_variant_widths:
+            for fmt in FORMATS:
+                await storage_service.delete_file(variant_path(relative_path, width, fmt))
+
+
+# Singleton instance
+image_variant_service = ImageVariantService()
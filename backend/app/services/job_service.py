@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Any, Awaitable, Callable
+
+from pymongo import ReturnDocument
+
+from ..config import get_settings
+from ..models.job import Job, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Called with the job payload and the id of the user who submitted it
+JobHandler = Callable[[dict[str, Any], str], Awaitable[dict[str, Any]]]
+
+
+class JobService:
+    """In-process asyncio worker pool backed by the Mongo ``jobs`` collection.
+
+    Job state lives in Mongo so queued work survives restarts; workers claim a
+    job atomically before running it, so several API processes can share the
+    collection without running a job twice.
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    def register(self, job_type: str, handler: JobHandler) -> None:
+        self._handlers[job_type] = handler
+
+    @property
+    def job_types(self) -> list[str]:
+        return list(self._handlers)
+
+    async def start(self) -> None:
+        """Requeue unfinished jobs and start the worker pool."""
+        self._queue = asyncio.Queue()
+        self._stopping = False
+
+        # Jobs left running by a process that died are handed back to the queue
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.job_stale_after)
+        await Job.get_motor_collection().update_many(
+            {"status": JOB_RUNNING, "updated_at": {"$lt": stale_before}},
+            {"$set": {"status": JOB_QUEUED, "started_at": None, "updated_at": now}},
+        )
+
+        queued = await Job.find(Job.status == JOB_QUEUED).sort(+Job.created_at).to_list()
+        for job in queued:
+            self._queue.put_nowait(job.id)
+
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(settings.job_workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers. Jobs still running are put back in the queue."""
+        self._stopping = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, user_id: str, job_type: str, payload: dict[str, Any]) -> Job:
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job = Job(user_id=user_id, type=job_type, payload=payload)
+        await job.insert()
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job. Returns False if it already finished."""
+        now = datetime.utcnow()
+        result = await Job.get_motor_collection().update_one(
+            {"_id": job_id, "status": {"$in": [JOB_QUEUED, JOB_RUNNING]}},
+            {"$set": {"status": JOB_CANCELLED, "finished_at": now, "updated_at": now}},
+        )
+
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()
+
+        return result.modified_count > 0
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job %s could not be processed", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        collection = Job.get_motor_collection()
+        now = datetime.utcnow()
+
+        # Claim the job; skips jobs cancelled while queued or taken by another process
+        claimed = await collection.find_one_and_update(
+            {"_id": job_id, "status": JOB_QUEUED},
+            {"$set": {"status": JOB_RUNNING, "started_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if claimed is None:
+            return
+
+        handler = self._handlers[claimed["type"]]
+        task = asyncio.create_task(handler(claimed["payload"], claimed["user_id"]))
+        self._running[job_id] = task
+
+        try:
+            result = await task
+            update = {"status": JOB_SUCCEEDED, "result": result}
+        except asyncio.CancelledError:
+            if not self._stopping:
+                # Cancelled through cancel(); the status is already recorded
+                return
+            await collection.update_one(
+                {"_id": job_id, "status": JOB_RUNNING},
+                {"$set": {"status": JOB_QUEUED, "started_at": None, "updated_at": datetime.utcnow()}},
+            )
+            raise
+        except Exception as e:
+            update = {"status": JOB_FAILED, "error": getattr(e, "detail", None) or str(e)}
+        finally:
+            self._running.pop(job_id, None)
+
+        now = datetime.utcnow()
+        await collection.update_one(
+            {"_id": job_id, "status": JOB_RUNNING},
+            {"$set": {**update, "finished_at": now, "updated_at": now}},
+        )
+
+
+# Singleton instance
+job_service = JobService()
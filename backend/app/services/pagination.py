@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(updated_at: datetime, doc_id: str) -> str:
+    """Encode the sort key of the last item on a page as an opaque cursor."""
+    raw = json.dumps({"u": updated_at.isoformat(), "i": doc_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Decode a cursor from ``encode_cursor``. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["u"]), str(data["i"])
+    except (KeyError, TypeError, UnicodeError, json.JSONDecodeError, base64.binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_filter(cursor: Optional[str]) -> dict[str, Any]:
+    """Mongo filter selecting documents after ``cursor`` in (updated_at, _id) descending order."""
+    if not cursor:
+        return {}
+
+    updated_at, doc_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$lt": doc_id}},
+        ]
+    }
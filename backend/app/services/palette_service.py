@@ -0,0 +1,146 @@
+import base64
+import colorsys
+import io
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+# Images are downsampled to at most this many pixels per side before clustering
+SAMPLE_SIZE = 96
+CLUSTER_COUNT = 6
+KMEANS_ITERATIONS = 12
+
+
+def decode_base64_image(data: str) -> bytes:
+    """Decode a base64 image, accepting both raw base64 and ``data:`` URLs."""
+    if data.startswith("data:"):
+        data = data.split(",", 1)[1]
+    return base64.b64decode(data)
+
+
+def _to_hex(rgb: np.ndarray) -> str:
+    r, g, b = (int(round(c)) for c in np.clip(rgb, 0, 255))
+    return f"#{r:02X}{g:02X}{b:02X}"
+
+
+def _luminance(rgb: np.ndarray) -> np.ndarray:
+    srgb = np.asarray(rgb, dtype=float) / 255.0
+    linear = np.where(srgb <= 0.03928, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    return linear @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def _contrast_ratio(a: np.ndarray, b: np.ndarray) -> float:
+    la, lb = float(_luminance(a)), float(_luminance(b))
+    return (max(la, lb) + 0.05) / (min(la, lb) + 0.05)
+
+
+def _saturation(rgb: np.ndarray) -> float:
+    r, g, b = (np.asarray(rgb, dtype=float) / 255.0)
+    return colorsys.rgb_to_hsv(r, g, b)[1]
+
+
+def _hue_distance(a: np.ndarray, b: np.ndarray) -> float:
+    ha = colorsys.rgb_to_hsv(*(np.asarray(a, dtype=float) / 255.0))[0]
+    hb = colorsys.rgb_to_hsv(*(np.asarray(b, dtype=float) / 255.0))[0]
+    d = abs(ha - hb)
+    return min(d, 1 - d)
+
+
+def _kmeans(pixels: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Deterministic k-means (k-means++ init with a fixed seed)."""
+    rng = np.random.default_rng(0)
+    centers = [pixels[rng.integers(len(pixels))]]
+    for _ in range(1, k):
+        dist = np.min(((pixels[:, None] - np.array(centers)[None]) ** 2).sum(-1), axis=1)
+        if dist.sum() == 0:
+            break
+        centers.append(pixels[rng.choice(len(pixels), p=dist / dist.sum())])
+    centers = np.array(centers)
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = ((pixels[:, None] - centers[None]) ** 2).sum(-1).argmin(axis=1)
+        updated = np.array([
+            pixels[labels == i].mean(axis=0) if np.any(labels == i) else centers[i]
+            for i in range(len(centers))
+        ])
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+
+    labels = ((pixels[:, None] - centers[None]) ** 2).sum(-1).argmin(axis=1)
+    return centers, labels
+
+
+def extract_palette(image_bytes: bytes) -> dict[str, str]:
+    """Extract primary/secondary/accent/background/text colors from an image.
+
+    CPU bound; call it through ``asyncio.to_thread`` from request handlers.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+        rgba = np.asarray(image.convert("RGBA"), dtype=float)
+
+    # Flatten transparency onto white and ignore fully transparent pixels
+    alpha = rgba[..., 3:4] / 255.0
+    rgb = rgba[..., :3] * alpha + 255.0 * (1 - alpha)
+    opaque = rgba[..., 3] > 0
+
+    pixels = rgb[opaque]
+    if len(pixels) == 0:
+        pixels = rgb.reshape(-1, 3)
+
+    centers, labels = _kmeans(pixels, min(CLUSTER_COUNT, len(np.unique(pixels, axis=0))))
+    counts = np.bincount(labels, minlength=len(centers)).astype(float)
+
+    # Background: the cluster that dominates the image border
+    border = np.concatenate([rgb[0], rgb[-1], rgb[:, 0], rgb[:, -1]])
+    border_labels = ((border[:, None] - centers[None]) ** 2).sum(-1).argmin(axis=1)
+    background_idx = int(np.bincount(border_labels, minlength=len(centers)).argmax())
+    background = centers[background_idx]
+
+    # Brand colors: frequent and saturated clusters other than the background
+    candidates = [i for i in range(len(centers)) if i != background_idx] or [background_idx]
+    scores = {i: counts[i] * (0.25 + _saturation(centers[i])) for i in candidates}
+    ranked = sorted(candidates, key=lambda i: scores[i], reverse=True)
+
+    primary = centers[ranked[0]]
+    remaining = ranked[1:]
+
+    secondary_idx = next(
+        (i for i in remaining if _hue_distance(centers[i], primary) > 0.05),
+        remaining[0] if remaining else None,
+    )
+    secondary = centers[secondary_idx] if secondary_idx is not None else primary
+    remaining = [i for i in remaining if i != secondary_idx]
+
+    # Accent: the most vivid remaining cluster that stands out from the primary
+    accent_idx = max(
+        remaining,
+        key=lambda i: _saturation(centers[i]) * _contrast_ratio(centers[i], primary),
+        default=None,
+    )
+    accent = centers[accent_idx] if accent_idx is not None else secondary
+
+    # Text: the most legible cluster on the background, or black/white
+    text = max(centers, key=lambda c: _contrast_ratio(c, background))
+    if _contrast_ratio(text, background) < 4.5:
+        text = np.array([17.0, 17.0, 17.0]) if _luminance(background) > 0.18 else np.array([255.0, 255.0, 255.0])
+
+    return {
+        "primary": _to_hex(primary),
+        "secondary": _to_hex(secondary),
+        "accent": _to_hex(accent),
+        "background": _to_hex(background),
+        "text": _to_hex(text),
+    }
+
+
+def try_extract_palette(image_bytes: Optional[bytes]) -> Optional[dict[str, str]]:
+    """Like ``extract_palette`` but returns None for missing or unreadable images."""
+    if not image_bytes:
+        return None
+    try:
+        return extract_palette(image_bytes)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
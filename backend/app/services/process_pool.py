@@ -0,0 +1,46 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, TypeVar
+
+from ..config import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+class ProcessPool:
+    """Lazily started process pool for CPU-bound work such as image encoding.
+
+    Workers are spawned rather than forked so they do not inherit the event
+    loop or open database sockets. Functions must be importable module-level
+    callables and their arguments picklable.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            self.shutdown()
+            raise
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Singleton instance
+image_pool = ProcessPool(settings.image_workers)
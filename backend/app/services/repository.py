@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import Optional, Any, TypeVar, Union
+
+from beanie import Document, UpdateResponse
+
+DocType = TypeVar("DocType", bound=Document)
+
+
+def owner_filter(doc_id: str, owner_id: Optional[str], owner_field: str = "user_id") -> dict[str, Any]:
+    filters: dict[str, Any] = {"_id": doc_id}
+    if owner_id is not None:
+        filters[owner_field] = owner_id
+    return filters
+
+
+def version_filter(field: str, version: Union[int, list[int]]) -> dict[str, Any]:
+    """Match documents at ``version`` (or any of several).
+
+    Documents saved before the field existed count as version 0.
+    """
+    versions = version if isinstance(version, list) else [version]
+    if 0 in versions:
+        return {field: {"$in": [*versions, None]}}
+    if len(versions) == 1:
+        return {field: versions[0]}
+    return {field: {"$in": versions}}
+
+
+async def exists_owned(
+    model: type[DocType],
+    doc_id: str,
+    owner_id: Optional[str],
+    owner_field: str = "user_id",
+) -> bool:
+    return await model.find(owner_filter(doc_id, owner_id, owner_field)).count() > 0
+
+
+async def update_owned(
+    model: type[DocType],
+    doc_id: str,
+    owner_id: Optional[str],
+    update_data: dict[str, Any],
+    owner_field: str = "user_id",
+    inc: Optional[dict[str, int]] = None,
+    conditions: Optional[dict[str, Any]] = None,
+) -> Optional[DocType]:
+    """Apply ``$set`` to a document owned by ``owner_id`` and return the new version.
+
+    Runs as a single ``find_one_and_update`` and stamps ``updated_at``; ``inc``
+    adds ``$inc`` counters to the same update and ``conditions`` further
+    restricts the match (e.g. an expected revision). Pass ``owner_id=None`` for
+    documents keyed by the owner's id (e.g. profiles). Returns None when no
+    matching document exists for this owner.
+    """
+    update: dict[str, Any] = {"$set": {**update_data, "updated_at": datetime.utcnow()}}
+    if inc:
+        update["$inc"] = inc
+
+    filters = owner_filter(doc_id, owner_id, owner_field)
+    if conditions:
+        filters.update(conditions)
+
+    return await model.find_one(filters).update(
+        update,
+        response_type=UpdateResponse.NEW_DOCUMENT,
+    )
@@ -0,0 +1,190 @@
+import re
+from typing import Any, Optional
+
+import numpy as np
+
+from ..schemas.ai_schemas import CanvasElement
+
+# Resolution of the saliency grid along the canvas' longer side
+GRID_SIZE = 64
+
+# Relative pull of each element type before size, contrast and position
+TYPE_WEIGHTS = {
+    "textbox": 1.0,
+    "i-text": 1.0,
+    "text": 1.0,
+    "image": 0.9,
+    "button": 0.95,
+    "circle": 0.55,
+    "triangle": 0.5,
+    "rect": 0.45,
+    "path": 0.4,
+    "line": 0.2,
+}
+DEFAULT_TYPE_WEIGHT = 0.5
+
+CTA_PATTERN = re.compile(
+    r"\b(shop|buy|order|get|try|learn|sign|join|start|download|book|subscribe|save|claim)\b",
+    re.IGNORECASE,
+)
+
+# Formats that are viewed top-to-bottom on a phone rather than scanned like a page
+VERTICAL_FORMAT_HINTS = ("story", "reel", "tiktok", "pin")
+
+
+def _relative_luminance(hex_color: str) -> Optional[float]:
+    value = hex_color.strip().lstrip("#")
+    if len(value) == 3:
+        value = "".join(c * 2 for c in value)
+    if len(value) != 6:
+        return None
+    try:
+        rgb = np.array([int(value[i:i + 2], 16) for i in (0, 2, 4)], dtype=float) / 255.0
+    except ValueError:
+        return None
+    linear = np.where(rgb <= 0.03928, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    return float(linear @ np.array([0.2126, 0.7152, 0.0722]))
+
+
+def _contrast(colors: Optional[list[str]]) -> float:
+    """Highest WCAG contrast between an element's colors, normalized to 0-1."""
+    if not colors:
+        return 0.5
+
+    luminances = [lum for lum in (_relative_luminance(c) for c in colors) if lum is not None]
+    if len(luminances) < 2:
+        # A single color contrasts against an assumed mid-tone canvas
+        return 0.5 if not luminances else min(1.0, abs(luminances[0] - 0.5) * 2)
+
+    lum = np.array(luminances)
+    lighter = np.maximum.outer(lum, lum)
+    darker = np.minimum.outer(lum, lum)
+    ratio = float(((lighter + 0.05) / (darker + 0.05)).max())
+    return min(1.0, (ratio - 1) / 20)
+
+
+def _label(element: CanvasElement) -> str:
+    if element.text:
+        return f'{element.type} "{element.text[:30]}"'
+    return element.type
+
+
+def _reading_prior(xs: np.ndarray, ys: np.ndarray, vertical: bool) -> np.ndarray:
+    """Position prior from reading patterns, on coordinates normalized to 0-1.
+
+    Page-like formats follow an F/Z pattern (top-left first, decaying to the
+    right and down); vertical formats favor the upper-center of the screen.
+    """
+    center = np.exp(-(((xs - 0.5) ** 2) / 0.18 + ((ys - 0.45) ** 2) / 0.18))
+    if vertical:
+        return 0.35 + 0.65 * center * np.exp(-0.6 * ys)
+
+    f_pattern = np.exp(-1.1 * ys) * (0.6 + 0.4 * np.exp(-1.4 * xs))
+    return 0.3 + 0.45 * f_pattern + 0.25 * center
+
+
+def compute_attention_heatmap(
+    elements: list[CanvasElement],
+    canvas_width: int,
+    canvas_height: int,
+    format: str,
+) -> dict[str, Any]:
+    """Predict attention zones and gaze order from element geometry and styling.
+
+    Returns the same shape as the LLM-based endpoint: ``zones`` with x/y/radius
+    in canvas percentages and 0-100 intensities, ``gazeOrder`` and ``summary``.
+    """
+    vertical = any(hint in format.lower() for hint in VERTICAL_FORMAT_HINTS) or canvas_height > canvas_width * 1.3
+
+    if not elements:
+        return {
+            "zones": [],
+            "gazeOrder": [],
+            "summary": "The canvas is empty, so attention will settle on the "
+                       + ("upper center." if vertical else "top-left corner."),
+        }
+
+    # Grid of cell centers normalized to 0-1
+    scale = GRID_SIZE / max(canvas_width, canvas_height)
+    grid_w = max(1, round(canvas_width * scale))
+    grid_h = max(1, round(canvas_height * scale))
+    gx = (np.arange(grid_w) + 0.5) / grid_w
+    gy = (np.arange(grid_h) + 0.5) / grid_h
+    grid_x, grid_y = np.meshgrid(gx, gy)
+
+    # Per-element features as vectors
+    left = np.array([e.left for e in elements], dtype=float)
+    top = np.array([e.top for e in elements], dtype=float)
+    width = np.array([max(e.width, 1.0) for e in elements], dtype=float)
+    height = np.array([max(e.height, 1.0) for e in elements], dtype=float)
+
+    cx = np.clip((left + width / 2) / canvas_width, 0, 1)
+    cy = np.clip((top + height / 2) / canvas_height, 0, 1)
+    area = np.clip(width * height / (canvas_width * canvas_height), 0, 1)
+
+    type_weight = np.array([TYPE_WEIGHTS.get(e.type.lower(), DEFAULT_TYPE_WEIGHT) for e in elements])
+    contrast = np.array([_contrast(e.colors) for e in elements])
+    font = np.array([
+        min(1.0, (e.fontSize or 0) / (canvas_height * 0.08)) if e.text else 0.0
+        for e in elements
+    ])
+    cta = np.array([1.0 if e.text and CTA_PATTERN.search(e.text) else 0.0 for e in elements])
+
+    # Large elements draw the eye, but full-bleed backgrounds fade into the scene
+    size = np.sqrt(area) * np.where(area > 0.6, 0.15, 1.0)
+    prior = _reading_prior(cx, cy, vertical)
+
+    salience = (
+        type_weight
+        * (0.35 + size)
+        * (0.5 + contrast)
+        * (1.0 + 0.8 * font + 0.5 * cta)
+        * prior
+    )
+
+    # Gaussian blob per element, summed over a (elements, rows, cols) tensor
+    sigma_x = np.maximum(width / canvas_width / 2, 0.04)[:, None, None]
+    sigma_y = np.maximum(height / canvas_height / 2, 0.04)[:, None, None]
+    blobs = salience[:, None, None] * np.exp(
+        -(
+            ((grid_x[None] - cx[:, None, None]) ** 2) / (2 * sigma_x ** 2)
+            + ((grid_y[None] - cy[:, None, None]) ** 2) / (2 * sigma_y ** 2)
+        )
+    )
+    heat = blobs.sum(axis=0) + 0.15 * salience.max() * _reading_prior(grid_x, grid_y, vertical)
+    heat = heat / heat.max() * 100
+
+    # Blend each element's own salience with the heat at its center cell, so an
+    # element overlapped by a stronger one does not inherit its intensity
+    col = np.clip((cx * grid_w).astype(int), 0, grid_w - 1)
+    row = np.clip((cy * grid_h).astype(int), 0, grid_h - 1)
+    intensity = 0.6 * salience / salience.max() * 100 + 0.4 * heat[row, col]
+
+    order = np.argsort(-intensity, kind="stable")
+    radius = np.clip(np.maximum(width / canvas_width, height / canvas_height) * 50, 5, 35)
+
+    zones = []
+    for rank, i in enumerate(order, start=1):
+        zones.append({
+            "x": round(float(cx[i] * 100), 1),
+            "y": round(float(cy[i] * 100), 1),
+            "radius": round(float(radius[i]), 1),
+            "intensity": int(round(float(intensity[i]))),
+            "label": _label(elements[i]),
+            "order": rank,
+        })
+
+    gaze_order = [zone["label"] for zone in zones]
+    pattern = "a top-to-bottom scroll pattern" if vertical else "an F/Z reading pattern"
+    summary = f"Viewers are likely to look at {gaze_order[0]} first"
+    if len(gaze_order) > 1:
+        summary += f", then {gaze_order[1]}"
+    if len(gaze_order) > 2:
+        summary += f" and {gaze_order[2]}"
+    summary += f", following {pattern}."
+
+    return {
+        "zones": zones,
+        "gazeOrder": gaze_order,
+        "summary": summary,
+    }
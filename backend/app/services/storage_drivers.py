@@ -0,0 +1,371 @@
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Optional, Any
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+import aiofiles
+import httpx
+
+from ..config import get_settings
+from .s3_signing import S3Signer, UNSIGNED_PAYLOAD
+
+settings = get_settings()
+
+UPLOAD_ID_PATTERN = re.compile(r"<UploadId>([^<]+)</UploadId>")
+ERROR_CODE_PATTERN = re.compile(rb"<Code>([^<]+)</Code>")
+
+# Without s3:ListBucket on the bucket, S3 answers 403 AccessDenied instead of
+# 404 NoSuchKey for keys that do not exist
+MISSING_KEY_CODES = {"NoSuchKey", "AccessDenied"}
+
+
+class StorageDriverError(Exception):
+    """The storage backend rejected or failed a request."""
+
+
+class DirectUploadsUnsupported(StorageDriverError):
+    """The configured driver cannot take uploads directly from clients."""
+
+
+class StorageDriver:
+    """Interface for where stored files live.
+
+    Keys are relative paths such as ``objects/ab/cd/<sha256>.png``. Files are
+    written from a local staging path so drivers can stream or rename them.
+    """
+
+    supports_direct_upload = False
+
+    def __init__(self, public_url_base: str):
+        self.public_url_base = public_url_base.rstrip("/")
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_url_base}/{key}"
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path of the file on this machine, for drivers that store locally."""
+        return None
+
+    async def put(self, source: Path, key: str, content_type: Optional[str] = None) -> None:
+        """Store the file at ``source`` under ``key``, consuming ``source``."""
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def size(self, key: str) -> Optional[int]:
+        """Size in bytes of a stored file, or None if it does not exist."""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        """Delete a file. Returns False if it did not exist."""
+        raise NotImplementedError
+
+    async def fetch(self, key: str, destination: Path) -> bool:
+        """Copy a stored file to ``destination``. Returns False if it does not exist."""
+        raise NotImplementedError
+
+    async def digest(self, key: str) -> Optional[tuple[str, int]]:
+        """SHA-256 hex digest and size of a stored file, or None if it does not exist."""
+        raise NotImplementedError
+
+    async def copy(self, source_key: str, key: str, content_type: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def presign_put(self, key: str, size: int, sha256: str, content_type: Optional[str]) -> dict[str, Any]:
+        """Method, URL and headers for a client to upload a file in one request.
+
+        The store must reject content that does not match ``size`` and ``sha256``.
+        """
+        raise DirectUploadsUnsupported()
+
+    async def create_multipart_upload(self, key: str, content_type: Optional[str]) -> str:
+        raise DirectUploadsUnsupported()
+
+    def presign_part(self, key: str, upload_id: str, part_number: int, size: int) -> str:
+        raise DirectUploadsUnsupported()
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        raise DirectUploadsUnsupported()
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        raise DirectUploadsUnsupported()
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalStorageDriver(StorageDriver):
+    """Files under ``storage_root``, served by the API's /storage mount."""
+
+    def __init__(self, root: Path, public_url_base: str):
+        super().__init__(public_url_base)
+        self.root = root
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self.root / key
+
+    async def put(self, source: Path, key: str, content_type: Optional[str] = None) -> None:
+        destination = self.root / key
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic within the storage filesystem, so readers never see a partial file
+        os.replace(source, destination)
+
+    async def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    async def size(self, key: str) -> Optional[int]:
+        path = self.root / key
+        return path.stat().st_size if path.is_file() else None
+
+    async def delete(self, key: str) -> bool:
+        path = self.root / key
+        if path.is_file():
+            os.remove(path)
+            return True
+        return False
+
+    async def fetch(self, key: str, destination: Path) -> bool:
+        # Callers read local files in place; see StorageService.fetch_file
+        return await self.exists(key)
+
+    def _digest(self, path: Path) -> tuple[str, int]:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(settings.upload_chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest(), path.stat().st_size
+
+    async def digest(self, key: str) -> Optional[tuple[str, int]]:
+        path = self.root / key
+        if not path.is_file():
+            return None
+        return await asyncio.to_thread(self._digest, path)
+
+    async def copy(self, source_key: str, key: str, content_type: Optional[str] = None) -> None:
+        destination = self.root / key
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        temp = destination.with_name(f"{destination.name}.{os.getpid()}.part")
+        await asyncio.to_thread(shutil.copyfile, self.root / source_key, temp)
+        os.replace(temp, destination)
+
+
+class S3StorageDriver(StorageDriver):
+    """Files in an S3-compatible bucket (AWS S3, MinIO, R2, ...).
+
+    Requests are signed with SigV4 and sent over a pooled httpx client. With
+    an endpoint URL, path-style addressing is used (what MinIO-style servers
+    expect); without one, AWS virtual-hosted addressing. Files above
+    ``s3_multipart_threshold`` are written with multipart uploads.
+    """
+
+    supports_direct_upload = True
+
+    def __init__(self):
+        if settings.s3_endpoint_url:
+            endpoint = settings.s3_endpoint_url.rstrip("/")
+            self.bucket_url = f"{endpoint}/{settings.s3_bucket}"
+        else:
+            self.bucket_url = f"https://{settings.s3_bucket}.s3.{settings.s3_region}.amazonaws.com"
+        super().__init__(settings.s3_public_url or self.bucket_url)
+        self.signer = S3Signer(settings.s3_access_key_id, settings.s3_secret_access_key, settings.s3_region)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0))
+        return self._client
+
+    def _url(self, key: str) -> str:
+        return f"{self.bucket_url}/{quote(key, safe='/-_.~')}"
+
+    async def _request(
+        self,
+        method: str,
+        key: str,
+        query: Optional[dict[str, str]] = None,
+        headers: Optional[dict[str, str]] = None,
+        content: Optional[bytes] = None,
+        ok: tuple[int, ...] = (200,),
+        check_body: bool = False,
+    ) -> httpx.Response:
+        url = self._url(key)
+        signed = self.signer.sign_headers(method, url, query=query, headers=headers, payload_hash=UNSIGNED_PAYLOAD)
+        response = await self.client.request(method, url, params=query, headers=signed, content=content)
+        # Copies and multipart completions can fail with a 200 and an error body
+        if response.status_code not in ok or (check_body and b"<Error>" in response.content):
+            raise StorageDriverError(f"S3 {method} {key} failed: {response.status_code} {response.text[:200]}")
+        return response
+
+    async def put(self, source: Path, key: str, content_type: Optional[str] = None) -> None:
+        headers = {"content-type": content_type} if content_type else {}
+        try:
+            if source.stat().st_size > settings.s3_multipart_threshold:
+                await self._put_multipart(source, key, content_type)
+            else:
+                async with aiofiles.open(source, "rb") as f:
+                    content = await f.read()
+                await self._request("PUT", key, headers=headers, content=content)
+        finally:
+            if source.exists():
+                os.remove(source)
+
+    async def _put_multipart(self, source: Path, key: str, content_type: Optional[str]) -> None:
+        upload_id = await self.create_multipart_upload(key, content_type)
+        parts = []
+        try:
+            async with aiofiles.open(source, "rb") as f:
+                while chunk := await f.read(settings.s3_multipart_part_size):
+                    part_number = len(parts) + 1
+                    response = await self._request(
+                        "PUT",
+                        key,
+                        query={"partNumber": str(part_number), "uploadId": upload_id},
+                        content=chunk,
+                    )
+                    parts.append((part_number, response.headers["etag"]))
+            await self.complete_multipart_upload(key, upload_id, parts)
+        except BaseException:
+            await asyncio.shield(self.abort_multipart_upload(key, upload_id))
+            raise
+
+    async def exists(self, key: str) -> bool:
+        return await self.size(key) is not None
+
+    def _is_missing(self, response: httpx.Response) -> bool:
+        """Whether a 403 or 404 error response with a body means the key does not exist."""
+        if response.status_code == 404:
+            return True
+        match = ERROR_CODE_PATTERN.search(response.content)
+        return response.status_code == 403 and bool(match) and match.group(1).decode() in MISSING_KEY_CODES
+
+    async def size(self, key: str) -> Optional[int]:
+        response = await self._request("HEAD", key, ok=(200, 403, 404))
+        if response.status_code == 404:
+            return None
+        if response.status_code == 403:
+            # HEAD errors have no body; a ranged GET tells a missing key from
+            # rejected credentials
+            response = await self._request("GET", key, headers={"range": "bytes=0-0"}, ok=(200, 206, 403, 404))
+            if response.status_code in (403, 404):
+                if self._is_missing(response):
+                    return None
+                raise StorageDriverError(f"S3 GET {key} failed: {response.status_code} {response.text[:200]}")
+            return int(response.headers.get("content-range", "/0").rsplit("/", 1)[-1])
+        return int(response.headers.get("content-length", 0))
+
+    async def delete(self, key: str) -> bool:
+        if not await self.exists(key):
+            return False
+        await self._request("DELETE", key, ok=(200, 204))
+        return True
+
+    async def fetch(self, key: str, destination: Path) -> bool:
+        url = self._url(key)
+        headers = self.signer.sign_headers("GET", url)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        temp = destination.with_name(f"{destination.name}.{os.getpid()}.part")
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                if self._is_missing(response):
+                    return False
+                raise StorageDriverError(f"S3 GET {key} failed: {response.status_code}")
+            async with aiofiles.open(temp, "wb") as f:
+                async for chunk in response.aiter_bytes(settings.upload_chunk_size):
+                    await f.write(chunk)
+        os.replace(temp, destination)
+        return True
+
+    async def digest(self, key: str) -> Optional[tuple[str, int]]:
+        url = self._url(key)
+        headers = self.signer.sign_headers("GET", url)
+        digest = hashlib.sha256()
+        size = 0
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                if self._is_missing(response):
+                    return None
+                raise StorageDriverError(f"S3 GET {key} failed: {response.status_code}")
+            async for chunk in response.aiter_bytes(settings.upload_chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    async def copy(self, source_key: str, key: str, content_type: Optional[str] = None) -> None:
+        """Server-side copy (single request, so up to 5GB)."""
+        headers = {
+            "x-amz-copy-source": f"/{settings.s3_bucket}/{quote(source_key, safe='/-_.~')}",
+            "x-amz-metadata-directive": "REPLACE",
+        }
+        if content_type:
+            headers["content-type"] = content_type
+        await self._request("PUT", key, headers=headers, check_body=True)
+
+    def presign_put(self, key: str, size: int, sha256: str, content_type: Optional[str]) -> dict[str, Any]:
+        # The length and checksum are signed, so S3 rejects any other content
+        headers = {
+            "content-length": str(size),
+            "x-amz-checksum-sha256": base64.b64encode(bytes.fromhex(sha256)).decode("ascii"),
+        }
+        if content_type:
+            headers["content-type"] = content_type
+        url = self.signer.presign("PUT", self._url(key), settings.s3_presign_expires, headers=headers)
+        # Browsers set Content-Length themselves
+        return {"method": "PUT", "url": url, "headers": {k: v for k, v in headers.items() if k != "content-length"}}
+
+    async def create_multipart_upload(self, key: str, content_type: Optional[str]) -> str:
+        headers = {"content-type": content_type} if content_type else {}
+        response = await self._request("POST", key, query={"uploads": ""}, headers=headers)
+        match = UPLOAD_ID_PATTERN.search(response.text)
+        if not match:
+            raise StorageDriverError(f"S3 did not return an upload id for {key}")
+        return match.group(1)
+
+    def presign_part(self, key: str, upload_id: str, part_number: int, size: int) -> str:
+        return self.signer.presign(
+            "PUT",
+            self._url(key),
+            settings.s3_presign_expires,
+            query={"partNumber": str(part_number), "uploadId": upload_id},
+            headers={"content-length": str(size)},
+        )
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        body = "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>{escape(etag)}</ETag></Part>"
+            for number, etag in sorted(parts)
+        )
+        await self._request(
+            "POST",
+            key,
+            query={"uploadId": upload_id},
+            headers={"content-type": "application/xml"},
+            content=f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode("utf-8"),
+            check_body=True,
+        )
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await self._request("DELETE", key, query={"uploadId": upload_id}, ok=(200, 204, 404))
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def create_storage_driver() -> StorageDriver:
+    """Build the storage driver configured in Settings."""
+    if settings.storage_driver == "local":
+        return LocalStorageDriver(Path(settings.storage_root), settings.public_url_base)
+    if settings.storage_driver == "s3":
+        return S3StorageDriver()
+    raise ValueError(f"Unknown storage driver: {settings.storage_driver}")
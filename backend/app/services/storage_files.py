@@ -0,0 +1,207 @@
+import mimetypes
+import os
+import re
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from .canvas_thumbnails import THUMBNAILS_FOLDER
+from .http_cache import CACHE_CONTROL_HEADER, ETAG_HEADER, IMMUTABLE_CACHE_CONTROL
+from .storage_service import TEMP_FOLDER, CACHE_FOLDER, PRECOMPRESSED_SUFFIXES, PRECOMPRESSED_TYPES
+
+# Folders whose files never change once written: content-addressed uploads
+# and variants derived from them
+IMMUTABLE_FOLDERS = {"objects", "variants"}
+
+# Files elsewhere named by a UUID or SHA-256 were also written once, except
+# previews, which are named by their document's id and replaced in place
+IMMUTABLE_NAME = re.compile(
+    r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{64})$",
+    re.IGNORECASE,
+)
+
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+# Everything else (e.g. previews replaced in place) is revalidated
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """First and last byte of a single ``bytes=`` range.
+
+    Returns None for headers that should be ignored (malformed or multiple
+    ranges), in which case the whole file is served. Raises
+    RangeNotSatisfiable if the range lies outside the file.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def cache_control(relative_path: str) -> str:
+    parts = relative_path.split("/")
+    stem = os.path.splitext(parts[-1])[0]
+    if parts[0] in IMMUTABLE_FOLDERS or (parts[0] != THUMBNAILS_FOLDER and IMMUTABLE_NAME.match(stem)):
+        return IMMUTABLE_CACHE_CONTROL
+    return REVALIDATE_CACHE_CONTROL
+
+
+def _accepts(request_headers: Headers, encoding: str) -> bool:
+    """Whether ``Accept-Encoding`` allows ``encoding`` (with a non-zero q-value)."""
+    for item in request_headers.get("accept-encoding", "").split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        if name.lower() != encoding:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+class FileRangeResponse(FileResponse):
+    """``206 Partial Content`` response with bytes ``start``-``end`` of a file."""
+
+    def __init__(self, path: PathLike, stat_result: os.stat_result, start: int, end: int, headers: dict[str, str]):
+        self.start = start
+        self.end = end
+        headers = {
+            **headers,
+            "content-range": f"bytes {start}-{end}/{stat_result.st_size}",
+            "content-length": str(end - start + 1),
+        }
+        super().__init__(path, status_code=206, headers=headers, stat_result=stat_result)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while remaining:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining = remaining - len(chunk) if chunk else 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+
+
+class StorageFiles(StaticFiles):
+    """Serves the storage root with caching, range and precompression support.
+
+    - ``Cache-Control: immutable`` for files that never change (content-
+      addressed uploads, their variants and UUID-named legacy uploads);
+      everything else is revalidated.
+    - Strong ETags (the content hash for content-addressed files) and
+      ``Last-Modified``, with ``304`` responses for conditional requests.
+    - Single ``Range`` requests (honouring ``If-Range``) for seeking in
+      large media.
+    - ``.br``/``.gz`` siblings of SVG and JSON files served to clients that
+      accept them.
+    """
+
+    def __init__(self, directory: PathLike):
+        super().__init__(directory=directory)
+        self.root = os.path.realpath(directory)
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        relative_path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+        if relative_path.split("/")[0] in (TEMP_FOLDER, CACHE_FOLDER):
+            # Uploads still being written, and copies of remotely stored files
+            raise HTTPException(status_code=404)
+
+        stem, ext = os.path.splitext(os.path.basename(full_path))
+        headers = {
+            "accept-ranges": "bytes",
+            CACHE_CONTROL_HEADER.lower(): cache_control(relative_path),
+        }
+        content_addressed = bool(CONTENT_ADDRESSED_NAME.match(stem))
+
+        served_path = full_path
+        etag_suffix = ""
+        if ext.lower() in PRECOMPRESSED_TYPES:
+            headers["vary"] = "Accept-Encoding"
+            # Ranges refer to the uncompressed file
+            if "range" not in request_headers:
+                for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+                    sibling = full_path + suffix
+                    if _accepts(request_headers, encoding) and os.path.isfile(sibling):
+                        served_path, stat_result = sibling, os.stat(sibling)
+                        headers["content-encoding"] = encoding
+                        etag_suffix = f"-{encoding}"
+                        break
+
+        if content_addressed:
+            # The same on every node, unlike an mtime-based tag
+            headers[ETAG_HEADER.lower()] = f'"{stem.lower()}{etag_suffix}"'
+
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        response = FileResponse(served_path, headers=headers, media_type=media_type, stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        range_header = request_headers.get("range")
+        if range_header and served_path == full_path and self._range_applies(request_headers, response.headers):
+            try:
+                byte_range = parse_range(range_header, stat_result.st_size)
+            except RangeNotSatisfiable:
+                return Response(
+                    status_code=416,
+                    headers={"content-range": f"bytes */{stat_result.st_size}", "accept-ranges": "bytes"},
+                )
+            if byte_range is not None:
+                return FileRangeResponse(
+                    served_path,
+                    stat_result,
+                    *byte_range,
+                    headers={**headers, "etag": response.headers["etag"], "content-type": response.headers["content-type"]},
+                )
+
+        return response
+
+    def _range_applies(self, request_headers: Headers, response_headers: Headers) -> bool:
+        """Whether ``If-Range`` (if sent) still matches the current file."""
+        if_range = request_headers.get("if-range")
+        if if_range is None:
+            return True
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == response_headers.get("etag")
+        return if_range == response_headers.get("last-modified")
@@ -1,64 +1,209 @@
 import os
+import gzip
 import uuid
+import asyncio
+import hashlib
+import mimetypes
 import aiofiles
 from pathlib import Path
-from typing import Optional
+from typing import Optional, AsyncIterator
 
 from ..config import get_settings
+from .storage_drivers import create_storage_driver
+
+try:
+    import brotli
+except ImportError:  # Optional; only .gz siblings are written without it
+    brotli = None
 
 settings = get_settings()
 
+# Uploads are written here first and renamed into place once complete
+TEMP_FOLDER = ".uploads"
+
+# Local copies of files held by remote drivers, for image processing
+CACHE_FOLDER = ".cache"
+
+# Text formats stored alongside compressed siblings for clients that accept them
+PRECOMPRESSED_TYPES = {".svg", ".json"}
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}  # In order of preference
+PRECOMPRESS_MIN_BYTES = 1024
+
+
+class FileTooLargeError(Exception):
+    """An upload exceeded the allowed size and was discarded."""
+
+    def __init__(self, max_bytes: int):
+        limit = f"{max_bytes // (1024 * 1024)}MB" if max_bytes >= 1024 * 1024 else f"{max_bytes} bytes"
+        super().__init__(f"File too large (max {limit})")
+        self.max_bytes = max_bytes
+
 
 class StorageService:
+    """Stored files, kept wherever the configured driver puts them.
+
+    ``storage_root`` always holds the staging area for uploads in progress;
+    with the local driver it is also where files are stored.
+    """
+
     def __init__(self):
         self.storage_root = Path(settings.storage_root)
-        self.public_url_base = settings.public_url_base
+        self.driver = create_storage_driver()
+        self.public_url_base = self.driver.public_url_base
 
-    async def upload_file(
+    def temp_path(self, suffix: str = ".part") -> Path:
+        """A fresh path in the staging area, for files to ``commit`` later."""
+        temp_dir = self.storage_root / TEMP_FOLDER
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        return temp_dir / f"{uuid.uuid4()}{suffix}"
+
+    async def stage(
         self,
-        file_content: bytes,
+        chunks: AsyncIterator[bytes],
+        max_bytes: Optional[int] = None,
+    ) -> tuple[Path, str, int]:
+        """Write a stream of chunks to a temporary file.
+        
+        Returns the temporary path, the SHA-256 hex digest of the content and
+        its size. Raises FileTooLargeError, leaving nothing behind, as soon as
+        ``max_bytes`` is exceeded. Pass the result to ``commit`` or ``discard``.
+        """
+        temp_path = self.temp_path()
+        
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(temp_path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise FileTooLargeError(max_bytes)
+                    digest.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            self.discard(temp_path)
+            raise
+        
+        return temp_path, digest.hexdigest(), size
+
+    async def commit(self, temp_path: Path, relative_path: str, content_type: Optional[str] = None) -> str:
+        """Store a staged file at ``relative_path`` and return its public URL.
+        
+        Readers never see a partial file: the local driver renames it into
+        place and object stores only expose completed uploads.
+        """
+        content_type = content_type or mimetypes.guess_type(relative_path)[0]
+        await self.driver.put(temp_path, relative_path, content_type)
+        return self.url_for(relative_path)
+
+    def discard(self, temp_path: Path) -> None:
+        """Remove a staged file that will not be committed."""
+        if temp_path.exists():
+            os.remove(temp_path)
+
+    async def exists(self, relative_path: str) -> bool:
+        return await self.driver.exists(relative_path)
+
+    def url_for(self, relative_path: str) -> str:
+        return self.driver.url_for(relative_path)
+
+    def relative_path(self, file_path: str) -> str:
+        """Path under the storage root for a public URL (or a relative path)."""
+        if file_path.startswith(self.public_url_base):
+            return file_path.replace(f"{self.public_url_base}/", "", 1)
+        return file_path.lstrip("/")
+
+    async def upload_stream(
+        self,
+        chunks: AsyncIterator[bytes],
         filename: str,
         folder: str = "assets",
+        max_bytes: Optional[int] = None,
     ) -> str:
+        """Write a file from a stream of chunks under a unique name and return its public URL."""
+        temp_path, _, _ = await self.stage(chunks, max_bytes)
+        try:
+            return await self.commit(temp_path, f"{folder}/{uuid.uuid4()}{Path(filename).suffix}")
+        finally:
+            self.discard(temp_path)
+
+    async def upload_file(self, file_content: bytes, filename: str, folder: str = "assets") -> str:
         """Upload a file and return its public URL."""
-        # Generate unique filename
-        ext = Path(filename).suffix
-        unique_name = f"{uuid.uuid4()}{ext}"
+        async def chunks() -> AsyncIterator[bytes]:
+            yield file_content
         
-        # Create folder if it doesn't exist
-        folder_path = self.storage_root / folder
-        folder_path.mkdir(parents=True, exist_ok=True)
+        return await self.upload_stream(chunks(), filename, folder)
+
+    def _precompress(self, full_path: Path) -> None:
+        content = full_path.read_bytes()
+        if len(content) < PRECOMPRESS_MIN_BYTES:
+            return
+        
+        encoders = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            encoders["br"] = lambda data: brotli.compress(data, quality=11)
         
-        # Save file
-        file_path = folder_path / unique_name
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(file_content)
+        for encoding, encode in encoders.items():
+            compressed = encode(content)
+            # Not worth serving unless it saves something
+            if len(compressed) < len(content):
+                sibling = full_path.with_name(full_path.name + PRECOMPRESSED_SUFFIXES[encoding])
+                temp = sibling.with_name(f"{sibling.name}.{uuid.uuid4()}.part")
+                temp.write_bytes(compressed)
+                os.replace(temp, sibling)
+
+    async def precompress(self, relative_path: str) -> None:
+        """Write compressed siblings (``.br``/``.gz``) of an SVG or JSON file.
         
-        # Return public URL
-        return f"{self.public_url_base}/{folder}/{unique_name}"
+        Only for locally stored files; object stores cannot choose between
+        encodings per request.
+        """
+        full_path = self.driver.local_path(relative_path)
+        if full_path and full_path.suffix.lower() in PRECOMPRESSED_TYPES and full_path.is_file():
+            await asyncio.to_thread(self._precompress, full_path)
 
     async def delete_file(self, file_path: str) -> bool:
-        """Delete a file by its path."""
-        # Convert URL to local path
-        if file_path.startswith(self.public_url_base):
-            relative_path = file_path.replace(f"{self.public_url_base}/", "")
-        else:
-            relative_path = file_path
+        """Delete a file by its path, along with any compressed siblings."""
+        relative_path = self.relative_path(file_path)
         
-        full_path = self.storage_root / relative_path
+        if not await self.driver.delete(relative_path):
+            return False
         
-        if full_path.exists():
-            os.remove(full_path)
-            return True
-        return False
-
-    def get_file_path(self, url: str) -> Optional[Path]:
-        """Get the local file path from a URL."""
-        if url.startswith(self.public_url_base):
-            relative_path = url.replace(f"{self.public_url_base}/", "")
-            return self.storage_root / relative_path
+        if Path(relative_path).suffix.lower() in PRECOMPRESSED_TYPES:
+            for suffix in PRECOMPRESSED_SUFFIXES.values():
+                await self.driver.delete(relative_path + suffix)
+        
+        cached = self.storage_root / CACHE_FOLDER / relative_path
+        if cached.is_file():
+            os.remove(cached)
+        return True
+
+    async def local_file(self, relative_path: str) -> Optional[Path]:
+        """A local copy of a stored file, downloaded to the cache for remote drivers.
+        
+        Returns None if the file does not exist.
+        """
+        if ".." in Path(relative_path).parts:
+            return None
+        
+        local_path = self.driver.local_path(relative_path)
+        if local_path is not None:
+            return local_path if local_path.is_file() else None
+        
+        cached = self.storage_root / CACHE_FOLDER / relative_path
+        if cached.is_file() or await self.driver.fetch(relative_path, cached):
+            return cached
+        return None
+
+    async def fetch_file(self, url: str) -> Optional[Path]:
+        """``local_file`` for one of our public URLs; None for any other URL."""
+        if url.startswith(f"{self.public_url_base}/"):
+            return await self.local_file(self.relative_path(url))
         return None
 
+    async def close(self) -> None:
+        await self.driver.close()
+
 
 # Singleton instance
 storage_service = StorageService()
@@ -0,0 +1,13 @@
+import json
+from typing import Any
+
+# Disable proxy buffering so events reach the client as soon as they are sent
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format a single server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
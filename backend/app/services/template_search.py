@@ -0,0 +1,365 @@
+import bisect
+import math
+import re
+import time
+from collections import Counter
+from typing import Optional, Any
+
+from ..config import get_settings
+from ..models.template import Template, TemplateSearchView
+
+settings = get_settings()
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Relative weight of a term match per field (mirrors the Mongo text index weights)
+FIELD_WEIGHTS = {
+    "name": 10.0,
+    "category": 5.0,
+    "description": 1.0,
+}
+
+# Changing any of these invalidates a template's search_tokens
+SEARCHED_FIELDS = set(FIELD_WEIGHTS)
+
+# Score multiplier for a prefix match relative to a whole-word match
+PREFIX_MATCH_FACTOR = 0.8
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def search_tokens(values: dict[str, Any]) -> list[str]:
+    """Distinct words of a template's searchable field values, as stored in ``search_tokens``."""
+    return sorted({token for field in FIELD_WEIGHTS for token in tokenize(values.get(field))})
+
+
+def parse_query(query: str) -> tuple[list[str], Optional[str]]:
+    """Split a query into whole words and a trailing prefix.
+
+    The last word is treated as a prefix (search-as-you-type) unless the query
+    ends with whitespace.
+    """
+    tokens = tokenize(query)
+    if not tokens or query[-1:].isspace():
+        return tokens, None
+    return tokens[:-1], tokens[-1]
+
+
+def format_key(width: int, height: int) -> str:
+    return f"{width}x{height}"
+
+
+def build_facets(templates: list[Any]) -> dict[str, list[dict[str, Any]]]:
+    categories = Counter(t.category for t in templates)
+    formats = Counter((t.format_width, t.format_height) for t in templates)
+    return {
+        "categories": [
+            {"value": category, "count": count}
+            for category, count in categories.most_common()
+        ],
+        "formats": [
+            {"value": format_key(w, h), "width": w, "height": h, "count": count}
+            for (w, h), count in formats.most_common()
+        ],
+    }
+
+
+class InMemoryTemplateIndex:
+    """Inverted index over template name, category and description."""
+
+    def __init__(self):
+        self.docs: dict[str, TemplateSearchView] = {}
+        self.postings: dict[str, dict[str, float]] = {}
+        self.vocabulary: list[str] = []
+        self.size = 0
+        self.frequencies: dict[str, int] = {}
+
+    def build(
+        self,
+        templates: list[TemplateSearchView],
+        size: Optional[int] = None,
+        frequencies: Optional[dict[str, int]] = None,
+    ) -> None:
+        """Index ``templates``.
+
+        When ``templates`` is only a subset of the collection, ``size`` and
+        ``frequencies`` (documents per token) give the collection-wide counts
+        for IDF; they default to those of ``templates``.
+        """
+        docs = {}
+        postings: dict[str, dict[str, float]] = {}
+
+        for template in templates:
+            docs[template.id] = template
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(getattr(template, field)):
+                    entry = postings.setdefault(token, {})
+                    entry[template.id] = entry.get(template.id, 0.0) + weight
+
+        self.docs = docs
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        self.size = len(docs) if size is None else size
+        self.frequencies = frequencies or {}
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + self.size / self.frequencies.get(token, len(self.postings[token])))
+
+    def _prefix_tokens(self, prefix: str) -> list[str]:
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff")
+        return self.vocabulary[start:end]
+
+    def match(self, terms: list[str], prefix: Optional[str]) -> dict[str, float]:
+        """Score documents matching any whole term and (if given) the prefix."""
+        scores: dict[str, float] = {}
+
+        for term in terms:
+            for doc_id, weight in self.postings.get(term, {}).items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * self._idf(term)
+
+        if prefix is None:
+            return scores
+
+        prefix_scores: dict[str, float] = {}
+        for token in self._prefix_tokens(prefix):
+            factor = 1.0 if token == prefix else PREFIX_MATCH_FACTOR
+            for doc_id, weight in self.postings[token].items():
+                score = weight * self._idf(token) * factor
+                prefix_scores[doc_id] = max(prefix_scores.get(doc_id, 0.0), score)
+
+        if terms:
+            # Whole terms and the prefix must both match
+            return {
+                doc_id: scores[doc_id] + prefix_score
+                for doc_id, prefix_score in prefix_scores.items()
+                if doc_id in scores
+            }
+        return prefix_scores
+
+
+class TemplateSearchService:
+    """Template search backed by a Mongo text index or an in-memory index."""
+
+    def __init__(self):
+        self.backend = settings.template_search_backend
+        self._index = InMemoryTemplateIndex()
+        self._built_at: Optional[float] = None
+
+    def invalidate(self) -> None:
+        """Mark the in-memory index stale after a template write."""
+        self._built_at = None
+
+    async def _ensure_index(self) -> InMemoryTemplateIndex:
+        expired = self._built_at is None or time.monotonic() - self._built_at > settings.template_cache_ttl
+        if expired:
+            templates = await Template.find_all().project(TemplateSearchView).to_list()
+            self._index.build(templates)
+            self._built_at = time.monotonic()
+        return self._index
+
+    async def search(
+        self,
+        query: str,
+        user_id: Optional[str] = None,
+        category: Optional[str] = None,
+        format: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> dict[str, Any]:
+        """Search templates visible to ``user_id`` (public only if None).
+
+        Returns ranked ``results`` (views with a ``score``), the ``total`` after
+        filters, and category/format ``facets`` counted before the category and
+        format filters are applied.
+        """
+        terms, prefix = parse_query(query)
+        if not terms and prefix is None:
+            return {"results": [], "total": 0, "facets": build_facets([])}
+
+        if self.backend == "mongo":
+            return await self._search_mongo(terms, prefix, user_id, category, format, limit, offset)
+        return await self._search_memory(terms, prefix, user_id, category, format, limit, offset)
+
+    async def backfill_tokens(self) -> int:
+        """Set ``search_tokens`` on templates saved before the field existed."""
+        count = 0
+        async for template in Template.find({"search_tokens": {"$exists": False}}).project(TemplateSearchView):
+            await Template.get_motor_collection().update_one(
+                {"_id": template.id},
+                {"$set": {"search_tokens": search_tokens(template.model_dump(include=SEARCHED_FIELDS))}},
+            )
+            count += 1
+        return count
+
+    async def _search_memory(self, terms, prefix, user_id, category, format, limit, offset):
+        index = await self._ensure_index()
+        return self._rank(index, index.match(terms, prefix), user_id, category, format, limit, offset)
+
+    async def _search_prefix(self, prefix, user_id, category, format, limit, offset):
+        """Prefix-only (single word) search for the Mongo backend.
+
+        Matches come from an anchored regex on the indexed ``search_tokens``.
+        Counts, facets and the document frequency of each completion are
+        aggregated in Mongo. Only the ``template_search_prefix_candidates``
+        most recently updated matches are loaded and scored like the in-memory
+        index, so with more matches than that the ranking covers those only.
+        """
+        matches_prefix = {"search_tokens": {"$regex": f"^{re.escape(prefix)}"}}
+        visibility = self._visibility(user_id)
+        filters = self._filters(category, format)
+
+        pipeline = [
+            {"$match": matches_prefix},
+            {"$facet": {
+                "frequencies": [
+                    {"$project": {"search_tokens": 1}},
+                    {"$unwind": "$search_tokens"},
+                    {"$match": matches_prefix},
+                    {"$group": {"_id": "$search_tokens", "count": {"$sum": 1}}},
+                ],
+                "total": [{"$match": {**visibility, **filters}}, {"$count": "count"}],
+                **self._facet_stages(visibility),
+            }},
+        ]
+        collection = Template.get_motor_collection()
+        faceted = (await collection.aggregate(pipeline).to_list(length=1))[0]
+
+        candidates = await Template.find(
+            {"$and": [matches_prefix, visibility, filters]}
+        ).sort([("updated_at", -1)]).limit(settings.template_search_prefix_candidates).project(
+            TemplateSearchView
+        ).to_list()
+
+        index = InMemoryTemplateIndex()
+        index.build(
+            candidates,
+            size=await collection.estimated_document_count(),
+            frequencies={f["_id"]: f["count"] for f in faceted["frequencies"]},
+        )
+        scores = index.match([], prefix)
+        candidates.sort(key=lambda t: (scores[t.id], t.updated_at), reverse=True)
+
+        return {
+            "results": [(t, scores[t.id]) for t in candidates[offset:offset + limit]],
+            "total": faceted["total"][0]["count"] if faceted["total"] else 0,
+            "facets": self._facets(faceted),
+        }
+
+    def _rank(self, index, scores, user_id, category, format, limit, offset):
+        matches = [
+            index.docs[doc_id] for doc_id in scores
+            if index.docs[doc_id].is_public or (user_id and index.docs[doc_id].user_id == user_id)
+        ]
+        facets = build_facets(matches)
+
+        if category:
+            matches = [t for t in matches if t.category == category]
+        if format:
+            matches = [t for t in matches if format_key(t.format_width, t.format_height) == format]
+
+        matches.sort(key=lambda t: (scores[t.id], t.updated_at), reverse=True)
+        page = matches[offset:offset + limit]
+
+        return {
+            "results": [(t, scores[t.id]) for t in page],
+            "total": len(matches),
+            "facets": facets,
+        }
+
+    def _visibility(self, user_id: Optional[str]) -> dict[str, Any]:
+        if user_id:
+            return {"$or": [{"is_public": True}, {"user_id": user_id}]}
+        return {"is_public": True}
+
+    def _filters(self, category: Optional[str], format: Optional[str]) -> dict[str, Any]:
+        filters: dict[str, Any] = {}
+        if category:
+            filters["category"] = category
+        if format:
+            width, _, height = format.partition("x")
+            if width.isdigit() and height.isdigit():
+                filters["format_width"] = int(width)
+                filters["format_height"] = int(height)
+        return filters
+
+    def _facet_stages(self, visibility: dict[str, Any]) -> dict[str, list[dict[str, Any]]]:
+        """``$facet`` pipelines counting visible matches per category and format."""
+        visible = [{"$match": visibility}] if visibility else []
+        return {
+            "categories": [
+                *visible,
+                {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+            ],
+            "formats": [
+                *visible,
+                {"$group": {
+                    "_id": {"width": "$format_width", "height": "$format_height"},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"count": -1}},
+            ],
+        }
+
+    def _facets(self, faceted: dict[str, Any]) -> dict[str, list[dict[str, Any]]]:
+        return {
+            "categories": [
+                {"value": c["_id"], "count": c["count"]}
+                for c in faceted["categories"]
+            ],
+            "formats": [
+                {
+                    "value": format_key(f["_id"]["width"], f["_id"]["height"]),
+                    "width": f["_id"]["width"],
+                    "height": f["_id"]["height"],
+                    "count": f["count"],
+                }
+                for f in faceted["formats"]
+            ],
+        }
+
+    async def _search_mongo(self, terms, prefix, user_id, category, format, limit, offset):
+        if not terms:
+            return await self._search_prefix(prefix, user_id, category, format, limit, offset)
+
+        visibility = self._visibility(user_id)
+        match: dict[str, Any] = {"$and": [visibility], "$text": {"$search": " ".join(terms)}}
+        if prefix is not None:
+            match["search_tokens"] = {"$regex": f"^{re.escape(prefix)}"}
+
+        filters = self._filters(category, format)
+
+        pipeline = [
+            {"$match": match},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+            {"$facet": {
+                "results": [
+                    {"$match": filters},
+                    {"$sort": {"score": -1, "updated_at": -1}},
+                    {"$skip": offset},
+                    {"$limit": limit},
+                    {"$project": {"canvas_data": 0, "canvas_blob": 0}},
+                ],
+                "total": [{"$match": filters}, {"$count": "count"}],
+                # Visibility is already part of the match
+                **self._facet_stages({}),
+            }},
+        ]
+
+        faceted = (await Template.get_motor_collection().aggregate(pipeline).to_list(length=1))[0]
+
+        return {
+            "results": [
+                (TemplateSearchView.model_validate(doc), doc["score"])
+                for doc in faceted["results"]
+            ],
+            "total": faceted["total"][0]["count"] if faceted["total"] else 0,
+            "facets": self._facets(faceted),
+        }
+
+
+# Singleton instance
+template_search = TemplateSearchService()